@@ -0,0 +1,64 @@
+"""
+Benchmark of the activity date handling at backfill scale.
+
+Compares the old round trips (parse + format in return_activity_data, parse + format
+in matched_activities_from_sheet, parse again for the today filter) with a single
+parse into typed UTC/local datetimes and date comparisons.
+
+Usage: python benchmarks/bench_activity_dates.py [n_activities ...]
+"""
+import importlib.util
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# Load strava/dates.py on its own (the strava package needs Strava credentials on import)
+DATES_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "strava", "dates.py")
+spec = importlib.util.spec_from_file_location("strava_dates", DATES_PATH)
+dates = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(dates)
+
+def make_start_dates(n):
+    start = datetime(2020, 1, 1, 6, 30, tzinfo=timezone.utc)
+    return [(start + timedelta(hours=7 * i)).strftime("%Y-%m-%dT%H:%M:%SZ") for i in range(n)]
+
+def old_round_trips(start_dates, lookup, today):
+    matched = 0
+    for start_date in start_dates:
+        final_time = datetime.fromisoformat(start_date.replace("Z", "+00:00")) \
+                            .astimezone(ZoneInfo("Europe/Athens")) \
+                            .strftime("%Y-%m-%d %H:%M")
+        act_date = datetime.fromisoformat(final_time.replace("Z", "")).strftime("%Y-%m-%d")
+        matched += act_date in lookup
+        matched += datetime.fromisoformat(final_time).date() == today
+    return matched
+
+def single_parse(start_dates, lookup, today):
+    matched = 0
+    for start_date in start_dates:
+        start_utc, start_local = dates.parse_start_date(start_date)
+        local_date = start_local.date()
+        matched += local_date in lookup
+        matched += local_date == today
+    return matched
+
+def bench(func, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    today = date(2022, 6, 1)
+    for n in sizes:
+        start_dates = make_start_dates(n)
+        days = {date(2020, 1, 1) + timedelta(days=i) for i in range(0, n // 3 + 2)}
+        str_lookup = {d.strftime("%Y-%m-%d") for d in days}
+        old = bench(old_round_trips, start_dates, str_lookup, today)
+        new = bench(single_parse, start_dates, days, today)
+        print(f"{n:>8} activities: round trips {old * 1000:8.1f} ms | single parse {new * 1000:8.1f} ms | {old / new:4.1f}x")
@@ -0,0 +1,107 @@
+"""
+Memory benchmark of the activity records across history sizes.
+
+Both flows start from the parsed Strava response (the list of summary payloads),
+built inside the traced region so the cost of keeping the payloads is measured:
+- old flow: the summaries stay referenced for the whole run and one dict per
+  activity is built from them (the code before the Activity records, kept here)
+- compact flow: main.match_activities, the code of the pipeline, which consumes
+  the summaries and builds one __slots__ Activity through return_activity_data
+The detail call of return_activity_data is replaced by a synthetic payload, so no
+request is made. Payloads are shaped like Strava summaries and details (map
+polyline, segment efforts, laps).
+
+Usage: python benchmarks/bench_activity_memory.py [n_activities ...]
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+# The strava package reads its credentials on import: use dummy ones and a scratch state directory
+scratch = tempfile.mkdtemp()
+with open(os.path.join(scratch, "strava_creds.ini"), "w") as f:
+    f.write("[STRAVA]\nclient_id = 0\nclient_secret = -\naccess_token = -\nrefresh_token = -\nexpires_at = 4102444800\n")
+os.environ.setdefault("STRAVA_CREDS_FILE", os.path.join(scratch, "strava_creds.ini"))
+os.environ.setdefault("STATE_DIR", scratch)
+os.environ["STRAVA_STREAMS"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from strava import activity, dates, strava_utils
+from main import match_activities
+
+ID_BASE = 10_000_000_000
+
+def make_summary(i):
+    start = datetime(2015, 1, 1, 6, tzinfo=timezone.utc) + timedelta(hours=9 * i)
+    return {
+        "id": ID_BASE + i,
+        "name": "Morning Run" if i % 2 else "Evening Workout",
+        "start_date": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "start_date_local": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "elapsed_time": 1800 + i % 1800,
+        "moving_time": 1700 + i % 1700,
+        "distance": 5000.0 + i % 3000,
+        "average_heartrate": 120.0 + i % 50,
+        "max_heartrate": 160.0 + i % 30,
+        "map": {"id": f"a{i}", "summary_polyline": "x" * 600},
+        **{f"field_{k}": k * 1.5 for k in range(40)},
+    }
+
+def make_detail(activity_id):
+    i = activity_id - ID_BASE
+    return {
+        "calories": 300.0 + i % 400,
+        "segment_efforts": [{"id": j, "name": f"segment {j}", "elapsed_time": j, "stats": list(range(10))} for j in range(20)],
+        "laps": [{"id": j, "distance": 1000.0, "elapsed_time": 300 + j} for j in range(10)],
+        **make_summary(i),
+    }
+
+strava_utils.get_activity_detail = make_detail
+
+def old_flow(n):
+    activities = [make_summary(i) for i in range(n)]
+    matched = []
+    for act in activities:
+        detail = make_detail(act["id"])
+        start_utc, start_local = dates.parse_start_date(act["start_date"])
+        matched.append({
+            "Id": act["id"],
+            "Name": act["name"],
+            "Start Date": start_local.strftime("%Y-%m-%d %H:%M"),
+            "Start UTC": start_utc,
+            "Start Local": start_local,
+            "Local Date": start_local.date(),
+            "Duration": activity.format_seconds(act["elapsed_time"]),
+            "Elapsed Time": act["elapsed_time"],
+            "Heart Rate Avg": act["average_heartrate"],
+            "Heart Rate Max": act["max_heartrate"],
+            "Calories": detail.get("calories"),
+            "Distance": act["distance"],
+        })
+    return activities, matched
+
+def compact_flow(n):
+    activities = [make_summary(i) for i in range(n)]
+    return match_activities(activities, {})
+
+def measure(func, n):
+    tracemalloc.start()
+    result = func(n)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained, peak
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [1_000, 5_000, 20_000]
+    mb = 1024 * 1024
+    for n in sizes:
+        old_retained, old_peak = measure(old_flow, n)
+        new_retained, new_peak = measure(compact_flow, n)
+        print(
+            f"{n:>7} activities: dicts retained {old_retained / mb:7.1f} MB (peak {old_peak / mb:7.1f}) | "
+            f"compact retained {new_retained / mb:6.1f} MB (peak {new_peak / mb:6.1f}) | "
+            f"{old_retained / new_retained:4.1f}x less"
+        )
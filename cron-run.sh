@@ -29,6 +29,14 @@ export GOOGLE_SHEET_FILE="${GOOGLE_SHEET_FILE}"
 export GRAPHS_SHEET_NAME="${GRAPHS_SHEET_NAME}"
 EOF
 
+# Optional settings, only exported when set so the app defaults apply otherwise
+for var in DERIVED_SHEET_NAME HR_MAX STRAVA_STREAMS ASYNC_PIPELINE TIMEZONE REPLICA_MAX_AGE STATE_DIR \
+           DASHBOARD_DIR PROFILE_DIR PROFILE_SAMPLE_INTERVAL QUOTA_SHEETS_READ QUOTA_SHEETS_WRITE QUOTA_STRAVA_READ QUOTA_MAX_WAIT; do
+    if [ -n "${!var+x}" ]; then
+        printf 'export %s=%q\n' "$var" "${!var}" >> /etc/cron.env
+    fi
+done
+
 # Write cron job
 echo "$CRON_SCHEDULE . /etc/cron.env; /usr/local/bin/python $APP_SCRIPT >> $LOG_FILE 2>&1" >> "$CRON_FILE"
 
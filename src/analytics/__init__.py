@@ -0,0 +1,9 @@
+from .history import load_activity_history, update_activity_history
+from .derived import update_derived_sheet, derived_tables
+
+__all__ = [
+    "load_activity_history",
+    "update_activity_history",
+    "update_derived_sheet",
+    "derived_tables",
+]
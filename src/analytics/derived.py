@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+from googleapiclient.errors import HttpError
+from gspread.utils import rowcol_to_a1
+from google_sheets.schema import SheetSchema, load_sheet_schema, read_columns
+from local_state import load_json, save_json
+from zones import HR_MAX, HR_ZONE_EDGES, HR_ZONES, ZONE_COLUMNS
+from .history import NUMERIC_COLUMNS, load_activity_history, save_activity_history, update_activity_history
+
+DERIVED_STATE_FILE = "derived_state.json"
+
+ROLLING_WINDOWS = (7, 30)  # days
+
+DAILY_HEADER = ["Date", "Weight"] + [f"Weight {w}d" for w in ROLLING_WINDOWS]
+WEEKLY_HEADER = ["Week", "Duration (h)", "Distance (km)", "Calories"] + [f"{z} (min)" for z in HR_ZONES]
+DAILY_FIRST_COL = 1    # column A
+WEEKLY_FIRST_COL = 6   # column F
+
+# Helper to read the weight series (weight by date) from the sheet
+def read_weights(sheet, schema=None, rows=None):
+    """
+    Reads only the date and weight columns of the sheet, found by their header (`schema`).
+    `rows` are [date, weight] data rows already read, if given.
+    """
+    if rows is None:
+        rows = read_columns(sheet, schema or load_sheet_schema(sheet), "date", "weight")
+    frame = pd.DataFrame([row[:2] for row in rows], columns=["date", "weight"])
+    frame["date"] = pd.to_datetime(frame["date"].str.strip(), format="%Y-%m-%d", errors="coerce")
+    frame["weight"] = pd.to_numeric(frame["weight"].str.replace(",", ".").str.strip(), errors="coerce")
+    return frame.dropna().groupby("date")["weight"].last()
+
+# Helper to compute the rolling weight means of the days in [start, end]
+def compute_daily_series(weights, start, end):
+    # the rolling windows of `start` reach back max(ROLLING_WINDOWS) - 1 days
+    days = pd.date_range(start - pd.Timedelta(days=max(ROLLING_WINDOWS) - 1), end, freq="D")
+    series = weights.reindex(days)
+
+    daily = pd.DataFrame({"weight": series})
+    for window in ROLLING_WINDOWS:
+        daily[f"weight_{window}d"] = series.rolling(f"{window}D", min_periods=1).mean()
+    return daily.loc[start:end]
+
+# Helper to compute weekly training load totals for the given week starts (Mondays)
+def compute_weekly_series(history, weeks):
+    """
+    Weekly totals of duration, distance and calories, plus the time spent per HR zone.
+    Zone time comes from the HR streams when they were cached, otherwise the elapsed
+    time of the activity is binned by its average HR.
+    """
+    frame = history[history["week"].isin(weeks)]
+    if frame.empty:
+        return pd.DataFrame(0.0, index=weeks, columns=["duration_h", "distance_km", "calories", *HR_ZONES])
+
+    # One-hot zone of the average HR, replaced by the stream zone times where available
+    zone_idx = np.digitize(frame["avg_hr"].to_numpy() / HR_MAX, HR_ZONE_EDGES)
+    binned = np.zeros((len(frame), len(HR_ZONES)))
+    has_hr = frame["avg_hr"].notna().to_numpy()
+    binned[has_hr, zone_idx[has_hr]] = frame["elapsed_time"].to_numpy()[has_hr]
+    streamed = frame[ZONE_COLUMNS].to_numpy(dtype=float)
+    has_streams = ~np.isnan(streamed).any(axis=1)
+    binned[has_streams] = streamed[has_streams]
+
+    totals = frame.groupby("week")[["elapsed_time", "distance", "calories"]].sum()
+    zone_time = pd.DataFrame(binned, index=frame.index, columns=HR_ZONES).groupby(frame["week"]).sum()
+
+    weekly = pd.DataFrame(index=weeks)
+    weekly["duration_h"] = totals["elapsed_time"] / 3600
+    weekly["distance_km"] = totals["distance"] / 1000
+    weekly["calories"] = totals["calories"]
+    zone_time = zone_time.reindex(index=weeks) / 60
+    weekly = pd.concat([weekly, zone_time], axis=1)
+    return weekly.fillna(0)
+
+# Helper to get the days whose rolling windows contain any of the changed days
+def touched_days(changed_days, end):
+    if changed_days.empty:
+        return changed_days
+    marks = pd.Series(1.0, index=changed_days).reindex(pd.date_range(changed_days.min(), end, freq="D"), fill_value=0)
+    touched = marks.rolling(f"{max(ROLLING_WINDOWS)}D", min_periods=1).max() > 0
+    return touched.index[touched.to_numpy()]
+
+# Helper to turn row offsets and their values into contiguous A1 ranges
+def build_value_ranges(sheet_title, offsets, rows, first_col):
+    """
+    offsets are 0-based data row positions (row 2 of the sheet is offset 0).
+    Returns a list of {"range", "values"} dicts, one per contiguous run of offsets.
+    """
+    if len(offsets) == 0:
+        return []
+
+    offsets = np.asarray(offsets)
+    breaks = np.flatnonzero(np.diff(offsets) != 1) + 1
+    last_col = first_col + len(rows[0]) - 1
+
+    data = []
+    for run_offsets, run_rows in zip(np.split(offsets, breaks), np.split(np.arange(len(rows)), breaks)):
+        start = rowcol_to_a1(int(run_offsets[0]) + 2, first_col)
+        end = rowcol_to_a1(int(run_offsets[-1]) + 2, last_col)
+        data.append({
+            "range": f"'{sheet_title}'!{start}:{end}",
+            "values": [rows[i] for i in run_rows]
+        })
+    return data
+
+# Helper to format a frame into sheet rows (blank for missing values)
+def frame_to_rows(index, frame, decimals):
+    frame = frame.round(decimals).astype(object).where(frame.notna(), "")
+    labels = index.strftime("%Y-%m-%d")
+    return [[label, *values] for label, values in zip(labels, frame.to_numpy().tolist())]
+
+# Helper to compute the whole derived tables from local data only (Sheet1 snapshot and activity history)
+def derived_tables(values):
+    """
+    `values` is a snapshot of Sheet1 (header included), its columns are found by the header.
+    Returns (daily, weekly) lists of rows with their header, laid out like the derived sheet
+    and with string cells like get_all_values. No API call is made, used for the offline dashboard.
+    """
+    schema = SheetSchema.detect(values[0] if values else [])
+    weights = read_weights(None, rows=schema.select(values[1:], "date", "weight"))
+    history = load_activity_history()
+    history[NUMERIC_COLUMNS] = history[NUMERIC_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    history["start"] = pd.to_datetime(history["start"])
+    history["week"] = history["start"].dt.normalize() - pd.to_timedelta(history["start"].dt.weekday, unit="D")
+
+    daily_rows = [DAILY_HEADER]
+    if len(weights):
+        days = pd.date_range(weights.index.min(), weights.index.max(), freq="D")
+        daily_rows += frame_to_rows(days, compute_daily_series(weights, days.min(), days.max()), 2)
+
+    weekly_rows = [WEEKLY_HEADER]
+    if len(history):
+        weeks = pd.date_range(history["week"].min(), history["week"].max(), freq="7D")
+        weekly_rows += frame_to_rows(weeks, compute_weekly_series(history, weeks), 2)
+    return [[str(cell) for cell in row] for row in daily_rows], [[str(cell) for cell in row] for row in weekly_rows]
+
+# Main function to update the derived analytics sheet
+def update_derived_sheet(service, spreadsheet_id, origin_sheet, derived_sheet, activities, plan=None, schema=None):
+    """
+    Computes the derived series and writes them into `derived_sheet` in one bulk write:
+    - columns A:D: daily weight with its 7- and 30-day rolling means
+    - columns F:N: weekly totals of duration, distance, calories and HR zone time
+    Only the rows touched by new or changed data are recomputed and written.
+    Returns True if successful (or nothing changed), False if an error occurred.
+    With a `plan`, the writes are recorded and no local state is saved.
+    `schema` is the column mapping of `origin_sheet`, detected from its header if not given.
+    """
+    state = load_json(DERIVED_STATE_FILE, {})
+    weights = read_weights(origin_sheet, schema)
+    history, changed_activity_days = update_activity_history(activities)
+    history["week"] = history["start"].dt.normalize() - pd.to_timedelta(history["start"].dt.weekday, unit="D")
+
+    starts = [s.min() for s in (weights.index, history["start"].dt.normalize()) if len(s)]
+    if not starts:
+        print("No data available for the derived sheet.")
+        return False
+
+    anchor = min(starts)
+    anchor_week = anchor - pd.Timedelta(days=anchor.weekday())
+    last_day = weights.index.max() if len(weights) else anchor
+    last_week = max([last_day, *history["start"].dt.normalize()])
+    last_week = last_week - pd.Timedelta(days=last_week.weekday())
+
+    # A new sheet or data before the anchor moves every row: rewrite everything
+    full = state.get("sheet_id") != derived_sheet.id or state.get("anchor") != anchor.strftime("%Y-%m-%d")
+    previous_weights = {} if full else state.get("weights", {})
+    current_weights = {day.strftime("%Y-%m-%d"): float(val) for day, val in weights.items()}
+
+    changed_days = {day for day, val in current_weights.items() if previous_weights.get(day) != val}
+    changed_days |= set(previous_weights) - set(current_weights)
+    previous_last_day = pd.Timestamp(state["last_day"]) if not full and "last_day" in state else anchor - pd.Timedelta(days=1)
+    new_days = pd.date_range(previous_last_day + pd.Timedelta(days=1), last_day, freq="D")
+    changed_days = pd.DatetimeIndex(sorted(changed_days)).union(new_days)
+    days = touched_days(changed_days[changed_days <= last_day], last_day)
+
+    previous_last_week = pd.Timestamp(state["last_week"]) if not full and "last_week" in state else anchor_week - pd.Timedelta(days=7)
+    weeks = pd.DatetimeIndex(changed_activity_days - pd.to_timedelta(changed_activity_days.weekday, unit="D"))
+    weeks = weeks.union(pd.date_range(previous_last_week + pd.Timedelta(days=7), last_week, freq="7D"))
+    if full:
+        weeks = pd.date_range(anchor_week, last_week, freq="7D")
+
+    data = []
+    if full:
+        data.append({"range": f"'{derived_sheet.title}'!A1:D1", "values": [DAILY_HEADER]})
+        data.append({"range": f"'{derived_sheet.title}'!F1:N1", "values": [WEEKLY_HEADER]})
+
+    if len(days) and len(weights):
+        daily = compute_daily_series(weights, days.min(), days.max()).loc[days]
+        offsets = (days - anchor).days
+        data += build_value_ranges(derived_sheet.title, offsets, frame_to_rows(days, daily, 2), DAILY_FIRST_COL)
+
+    if len(weeks):
+        weekly = compute_weekly_series(history, weeks)
+        offsets = (weeks - anchor_week).days // 7
+        data += build_value_ranges(derived_sheet.title, offsets, frame_to_rows(weeks, weekly, 2), WEEKLY_FIRST_COL)
+
+    if not data:
+        return True
+
+    needed_rows = max((last_day - anchor).days, (last_week - anchor_week).days // 7) + 2
+    if plan is not None:
+        if needed_rows > derived_sheet.row_count:
+            plan.add("worksheet.add_rows", derived_sheet.title, {"rows": needed_rows - derived_sheet.row_count})
+        return plan.add("values.batchUpdate", derived_sheet.title, {"valueInputOption": "RAW", "data": data})
+
+    try:
+        # Grow the sheet if the series outgrew it
+        if needed_rows > derived_sheet.row_count:
+            derived_sheet.add_rows(needed_rows - derived_sheet.row_count)
+
+        service.spreadsheets().values().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={"valueInputOption": "RAW", "data": data}
+        ).execute()
+    except HttpError as e:
+        print(f"Failed to update derived sheet '{derived_sheet.title}': {e}")
+        return False
+
+    save_json(DERIVED_STATE_FILE, {
+        "sheet_id": derived_sheet.id,
+        "anchor": anchor.strftime("%Y-%m-%d"),
+        "last_day": last_day.strftime("%Y-%m-%d"),
+        "last_week": last_week.strftime("%Y-%m-%d"),
+        "weights": current_weights,
+    })
+    # saved last: until the write went through, the next run sees these activities as changed again
+    if len(changed_activity_days):
+        save_activity_history(history)
+    return True
@@ -0,0 +1,67 @@
+import os
+import pandas as pd
+from local_state import state_path
+from zones import ZONE_COLUMNS
+
+ACTIVITY_HISTORY_FILE = "activities.csv"
+HISTORY_COLUMNS = ["id", "start", "elapsed_time", "distance", "calories", "avg_hr", *ZONE_COLUMNS]
+NUMERIC_COLUMNS = ["elapsed_time", "distance", "calories", "avg_hr", *ZONE_COLUMNS]
+
+# Helper to load the local history of synced activities
+def load_activity_history():
+    path = state_path(ACTIVITY_HISTORY_FILE)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    return pd.read_csv(path, dtype={"start": str}).reindex(columns=HISTORY_COLUMNS)
+
+# Helper to upsert synced activities into the local history
+def update_activity_history(activities):
+    """
+    Upserts the matched Strava activities (Activity records) into the local activity history (by id).
+    Returns (history, changed_days):
+    - history: DataFrame of all synced activities, `start` parsed to datetime
+    - changed_days: DatetimeIndex of the days with new or changed activities
+    The local history isn't saved here: save it with `save_activity_history` once the
+    changes are applied, so failed runs see the same activities as changed again.
+    """
+    old = load_activity_history()
+    new = pd.DataFrame(
+        [
+            {
+                "id": act.id,
+                "start": act.start_date,
+                "elapsed_time": act.elapsed_time,
+                "distance": act.distance or 0,
+                "calories": act.calories,
+                "avg_hr": act.avg_hr,
+                **dict(zip(ZONE_COLUMNS, act.hr_zones or [None] * len(ZONE_COLUMNS))),
+            }
+            for act in activities
+        ],
+        columns=HISTORY_COLUMNS
+    )
+
+    for frame in (old, new):
+        frame[NUMERIC_COLUMNS] = frame[NUMERIC_COLUMNS].apply(pd.to_numeric, errors="coerce")
+        frame["id"] = pd.to_numeric(frame["id"], errors="coerce").astype("Int64")
+
+    # New or changed rows compared to the stored history
+    merged = new.merge(old, on="id", how="left", suffixes=("", "_old"), indicator=True)
+    changed = merged["_merge"] == "left_only"
+    for col in ["start"] + NUMERIC_COLUMNS:
+        differs = merged[col] != merged[f"{col}_old"]
+        both_missing = merged[col].isna() & merged[f"{col}_old"].isna()
+        changed |= differs & ~both_missing
+    changed_days = pd.DatetimeIndex(pd.to_datetime(merged.loc[changed, "start"]).dt.normalize().unique())
+
+    history = pd.concat([old[~old["id"].isin(new["id"])], new], ignore_index=True)
+    history["start"] = pd.to_datetime(history["start"])
+    return history, changed_days.sort_values()
+
+# Helper to save the local history of synced activities (atomically)
+def save_activity_history(history):
+    history = history.reindex(columns=HISTORY_COLUMNS).sort_values("start")
+    history["start"] = history["start"].dt.strftime("%Y-%m-%d %H:%M")  # same format as Activity.start_date
+    path = state_path(ACTIVITY_HISTORY_FILE)
+    history.to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
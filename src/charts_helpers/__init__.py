@@ -1,19 +1,27 @@
 from .template import build_chart_request
+from .html_render import render_dashboard
 from .utils import (
+    column_index,
     get_contiguous_ranges,
     compute_y_axis_window,
     find_existing_chart_id,
+    find_existing_chart_ids,
     split_data_by_week,
-    execute_request
+    execute_request,
+    execute_requests
 )
 
 __all__ = [
     "build_chart_request",
+    "render_dashboard",
+    "column_index",
     "get_contiguous_ranges",
     "compute_y_axis_window",
     "find_existing_chart_id",
+    "find_existing_chart_ids",
     "split_data_by_week",
-    "execute_request"
+    "execute_request",
+    "execute_requests"
 ]
 
 
@@ -0,0 +1,130 @@
+import html
+import os
+from datetime import datetime
+from .utils import column_index, get_contiguous_ranges, compute_y_axis_window
+
+# Margins of the plot area inside a chart (pixels)
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 60, 20, 40, 50
+Y_TICKS = 5
+
+# Helper to get the (date, y) points of a chart range from a data snapshot
+def chart_points(values, range_info, x_column):
+    x_idx = column_index(x_column)
+    points = []
+    for row in values[range_info["first_row"]:range_info["last_row"]]:
+        x_val = row[x_idx].strip() if len(row) > x_idx else ""
+        y_val = row[range_info["y_col"]].strip() if len(row) > range_info["y_col"] else ""
+        try:
+            points.append((datetime.strptime(x_val, "%Y-%m-%d"), float(y_val)))
+        except ValueError:
+            continue  # gap in the series, like in the Sheets chart
+    return points
+
+# Helper to render one line chart as inline SVG
+def render_svg(chart_name, points, y_min, y_max, width=800, height=400, x_axis_title="Date", y_axis_title="Weight"):
+    plot_w = width - MARGIN_LEFT - MARGIN_RIGHT
+    plot_h = height - MARGIN_TOP - MARGIN_BOTTOM
+    x_start, x_end = points[0][0], points[-1][0]
+    x_span = (x_end - x_start).total_seconds() or 1
+    y_span = (y_max - y_min) or 1
+
+    def x_pos(date):
+        return MARGIN_LEFT + (date - x_start).total_seconds() / x_span * plot_w
+
+    def y_pos(val):
+        return MARGIN_TOP + (1 - (min(max(val, y_min), y_max) - y_min) / y_span) * plot_h
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+        f'<text x="{width / 2}" y="24" text-anchor="middle" class="title">{html.escape(chart_name)}</text>',
+    ]
+    for i in range(Y_TICKS):
+        val = y_min + y_span * i / (Y_TICKS - 1)
+        y = y_pos(val)
+        parts.append(f'<line x1="{MARGIN_LEFT}" y1="{y:.1f}" x2="{MARGIN_LEFT + plot_w}" y2="{y:.1f}" class="grid"/>')
+        parts.append(f'<text x="{MARGIN_LEFT - 6}" y="{y + 4:.1f}" text-anchor="end">{val:.1f}</text>')
+
+    bottom = MARGIN_TOP + plot_h
+    parts.append(f'<text x="{MARGIN_LEFT}" y="{bottom + 18}" text-anchor="start">{x_start:%Y-%m-%d}</text>')
+    parts.append(f'<text x="{MARGIN_LEFT + plot_w}" y="{bottom + 18}" text-anchor="end">{x_end:%Y-%m-%d}</text>')
+    parts.append(f'<text x="{MARGIN_LEFT + plot_w / 2}" y="{height - 8}" text-anchor="middle">{html.escape(x_axis_title)}</text>')
+    parts.append(
+        f'<text x="14" y="{MARGIN_TOP + plot_h / 2}" text-anchor="middle" '
+        f'transform="rotate(-90 14 {MARGIN_TOP + plot_h / 2})">{html.escape(y_axis_title)}</text>'
+    )
+
+    coords = " ".join(f"{x_pos(date):.1f},{y_pos(val):.1f}" for date, val in points)
+    parts.append(f'<polyline points="{coords}" class="series"/>')
+    for date, val in points:
+        parts.append(f'<circle cx="{x_pos(date):.1f}" cy="{y_pos(val):.1f}" r="2"><title>{date:%Y-%m-%d}: {val:g}</title></circle>')
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+# Render a static HTML dashboard of the given chart definitions
+def render_dashboard(definitions, path, title="Dashboard"):
+    """
+    Takes the same chart definitions as ChartSet (chart_name, x_column, y_column and
+    optionally y_axis_title, width, height). The data of a chart comes from its
+    `values` (a snapshot of rows, header included) or else from its `origin_sheet`,
+    read once per sheet. Ranges and y-windows are computed like for the Sheets charts.
+    Returns True if the dashboard was written, False if an error occurred.
+    """
+    snapshots = {}
+    charts = []
+    for definition in definitions:
+        values = definition.get("values")
+        origin_sheet = definition.get("origin_sheet")
+        if values is None:
+            if origin_sheet.id not in snapshots:
+                snapshots[origin_sheet.id] = origin_sheet.get_all_values()
+            values = snapshots[origin_sheet.id]
+
+        chart_name = definition["chart_name"]
+        x_column = definition["x_column"]
+        ranges = get_contiguous_ranges(origin_sheet, x_column, definition["y_column"], values=values)
+        points = chart_points(values, ranges[2], x_column) if ranges else []
+        if not points:
+            print(f"No valid contiguous data range found for chart '{chart_name}'.")
+            continue
+
+        y_min, y_max = compute_y_axis_window(origin_sheet, ranges[2], values=values)
+        charts.append(render_svg(
+            chart_name,
+            points,
+            y_min,
+            y_max,
+            width=definition.get("width", 800),
+            height=definition.get("height", 400),
+            y_axis_title=definition.get("y_axis_title", "Weight")
+        ))
+
+    page = f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 20px; color: #333; }}
+svg {{ display: block; margin-bottom: 24px; font-size: 12px; }}
+.title {{ font-size: 16px; font-weight: bold; }}
+.grid {{ stroke: #e0e0e0; }}
+.series {{ fill: none; stroke: #4285f4; stroke-width: 2; stroke-linejoin: round; }}
+circle {{ fill: #4285f4; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p>Generated {datetime.now():%Y-%m-%d %H:%M}</p>
+{chr(10).join(charts)}
+</body>
+</html>
+"""
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(page)
+        os.replace(path + ".tmp", path)
+        return True
+    except OSError as e:
+        print(f"Failed to write dashboard '{path}': {e}")
+        return False
@@ -1,22 +1,34 @@
 from googleapiclient.errors import HttpError
+from gspread.utils import a1_to_rowcol
 from datetime import datetime
 from datetime import datetime, timedelta
 import itertools
 
+# Helper to get the 0-based index of a column given as letters ("D", "AB") or already as an index
+def column_index(column):
+    if isinstance(column, int):
+        return column
+    return a1_to_rowcol(f"{column.strip().upper()}1")[1] - 1
+
 # Helper to get contiguous data ranges
-def get_contiguous_ranges(sheet, x_column, y_column):
+def get_contiguous_ranges(sheet, x_column, y_column, values=None):
     """
     Returns x_range and y_range dictionaries ready for Google Sheets API,
-    based on contiguous rows with valid data in x and y columns.
+    based on contiguous rows with a date in the x column and a value in the y column.
     Returns None if no valid data found.
+    `values` is a snapshot of sheet.get_all_values(), read from the sheet if not given.
+    `sheet` may be None when only `values` are given (the ranges get no sheetId).
     """
-    values = sheet.get_all_values()
+    if values is None:
+        values = sheet.get_all_values()
     first_row = None
     last_row = None
 
+    x_col_idx = column_index(x_column)
+    y_col_idx = column_index(y_column)
     for idx, row in enumerate(values[1:], start=2):
-        date_val = row[0].strip() if len(row) > 0 else ""
-        y_val = row[ord(y_column) - ord("A")].strip() if len(row) > ord(y_column) - ord("A") else ""
+        date_val = row[x_col_idx].strip() if len(row) > x_col_idx else ""
+        y_val = row[y_col_idx].strip() if len(row) > y_col_idx else ""
 
         try:
             datetime.strptime(date_val, "%Y-%m-%d")
@@ -34,11 +46,11 @@ def get_contiguous_ranges(sheet, x_column, y_column):
 
     first_row_idx = first_row - 1
     last_row_idx = last_row
-    x_col_idx = ord(x_column) - ord("A")
-    y_col_idx = ord(y_column) - ord("A")
+
+    sheet_id = sheet.id if sheet is not None else None
 
     x_range = {
-        "sheetId": sheet.id,
+        "sheetId": sheet_id,
         "startRowIndex": first_row_idx,
         "endRowIndex": last_row_idx,
         "startColumnIndex": x_col_idx,
@@ -46,7 +58,7 @@ def get_contiguous_ranges(sheet, x_column, y_column):
     }
 
     y_range = {
-        "sheetId": sheet.id,
+        "sheetId": sheet_id,
         "startRowIndex": first_row_idx,
         "endRowIndex": last_row_idx,
         "startColumnIndex": y_col_idx,
@@ -56,8 +68,9 @@ def get_contiguous_ranges(sheet, x_column, y_column):
     return x_range, y_range, {"first_row": first_row_idx, "last_row": last_row_idx, "y_col": y_col_idx}
 
 # Helper to compute y-axis window
-def compute_y_axis_window(sheet, range_info, padding=1.5):
-    values = sheet.get_all_values()
+def compute_y_axis_window(sheet, range_info, padding=1.5, values=None):
+    if values is None:
+        values = sheet.get_all_values()
     y_values = []
 
     for row in values[1:]:
@@ -76,30 +89,42 @@ def compute_y_axis_window(sheet, range_info, padding=1.5):
 
 # Helper to find existing chart by name
 def find_existing_chart_id(service, spreadsheet_id, chart_name):
+    return find_existing_chart_ids(service, spreadsheet_id).get(chart_name.strip().lower())
+
+# Helper to map the titles of all existing charts to their ids with one metadata read
+def find_existing_chart_ids(service, spreadsheet_id):
+    """
+    Returns {lowercase chart title: chartId} for every chart in the spreadsheet.
+    """
     try:
         sheets = service.spreadsheets().get(
             spreadsheetId=spreadsheet_id,
-            includeGridData=False
+            includeGridData=False,
+            fields="sheets(charts(chartId,spec(title)))"
         ).execute().get("sheets", [])
 
+        chart_ids = {}
         for sheet in sheets:
-            if "charts" in sheet:
-                for chart in sheet["charts"]:
-                    spec = chart.get("spec", {})
-                    title = spec.get("title", "").strip()
-                    if title.lower() == chart_name.lower():
-                        return chart["chartId"]
-        return None
+            for chart in sheet.get("charts", []):
+                title = chart.get("spec", {}).get("title", "").strip().lower()
+                chart_ids.setdefault(title, chart["chartId"])
+        return chart_ids
     except Exception as e:
         print(f"Error scanning existing charts: {e}")
-        return None
+        return {}
 
 # Helper to execute chart request
-def execute_request(service, spreadsheet_id, request, chart_name):
+def execute_request(service, spreadsheet_id, request, chart_name, plan=None):
+    return execute_requests(service, spreadsheet_id, [request], chart_name, plan)
+
+# Helper to execute several chart requests in one batchUpdate
+def execute_requests(service, spreadsheet_id, requests, chart_name, plan=None):
+    if plan is not None:
+        return plan.add("spreadsheets.batchUpdate", chart_name, {"requests": requests})
     try:
         service.spreadsheets().batchUpdate(
             spreadsheetId=spreadsheet_id,
-            body={"requests": [request]}
+            body={"requests": requests}
         ).execute()
         return True
     except HttpError as e:
@@ -114,8 +139,8 @@ def split_data_by_week(values, x_column, y_column):
         (x_range, y_range, week_start_str, week_end_str, week_number)
     """
     data = []
-    x_index = ord(x_column) - ord("A")
-    y_index = ord(y_column) - ord("A")
+    x_index = column_index(x_column)
+    y_index = column_index(y_column)
 
     for idx, row in enumerate(values):
         if len(row) <= max(x_index, y_index):
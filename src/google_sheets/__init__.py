@@ -1,13 +1,24 @@
 from .auth import GoogleSheetAuth
-from .graph import Chart
+from .graph import Chart, ChartSet
 from .sheet_utils import fix_format_of_sheet_data,build_sheet_lookup,ensure_or_create_sheet,insert_activity_table,get_last_activity_row
+from .layout import LayoutCursor
+from .plan import WritePlan
+from .replica import SheetReplica
+from .schema import SheetSchema, SheetSchemaError, load_sheet_schema
 
 __all__ = [
     "GoogleSheetAuth",
     "Chart",
+    "ChartSet",
     "fix_format_of_sheet_data",
     "build_sheet_lookup",
     "ensure_or_create_sheet",
     "insert_activity_table",
     "get_last_activity_row",
-]
\ No newline at end of file
+    "LayoutCursor",
+    "WritePlan",
+    "SheetReplica",
+    "SheetSchema",
+    "SheetSchemaError",
+    "load_sheet_schema",
+]
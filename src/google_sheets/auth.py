@@ -1,8 +1,10 @@
 import gspread
 from google.oauth2.service_account import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaFileUpload, build_http
 from gspread.utils import rowcol_to_a1
+from quota import throttle_session, throttle_http
 
 
 # Helper class to handle Google Sheets authentication and access
@@ -18,11 +20,16 @@ class GoogleSheetAuth:
 
         self.creds = Credentials.from_service_account_file(cred_file, scopes=scopes)
         self.client = gspread.authorize(self.creds)
+        # every Sheets call goes through the quota scheduler (gspread 6 keeps the session in http_client)
+        throttle_session(getattr(self.client, "http_client", self.client).session)
         self.spreadsheet = self.client.open(sheet_name)
 
         # **Add this service object for Sheets API calls**
-        self.service = build('sheets', 'v4', credentials=self.creds)
+        # build_http keeps the 60 s socket timeout googleapiclient sets by default
+        self.service = build('sheets', 'v4', http=throttle_http(AuthorizedHttp(self.creds, http=build_http())))
         self.spreadsheet_id = self.spreadsheet.id
+        # Drive API for the spreadsheet version (own http client, httplib2 isn't thread-safe)
+        self.drive = build('drive', 'v3', http=AuthorizedHttp(self.creds, http=build_http()))
     # Get a specific sheet by name or the first sheet by default
     def get_sheet(self, sheet_name=None):
         if sheet_name:
@@ -1,11 +1,20 @@
+import hashlib
+import json
 from charts_helpers import ( 
     build_chart_request,
     get_contiguous_ranges,
     split_data_by_week,
     compute_y_axis_window,
-    find_existing_chart_id,
-    execute_request
+    find_existing_chart_ids,
+    execute_requests
 )
+from local_state import load_json, save_json
+
+CHARTS_STATE_FILE = "charts.json"
+
+# Helper to hash the chart requests of a batchUpdate
+def requests_hash(requests):
+    return hashlib.blake2b(json.dumps(requests, sort_keys=True).encode(), digest_size=8).hexdigest()
 
 # Main Chart class to handle chart creation and updating
 class Chart:
@@ -15,8 +24,8 @@ class Chart:
         self.chart_style = chart_style
         self.origin_sheet = origin_sheet
         self.target_sheet = target_sheet
-        self.x_column = x_column.upper()
-        self.y_column = y_column.upper()
+        self.x_column = x_column
+        self.y_column = y_column
         self.options = options or {}
     # Create or update chart in the target sheet
     def create_chart(
@@ -26,47 +35,18 @@ class Chart:
         graph_pos_row,
         graph_pos_col,
         weekly=False,
+        plan=None,
     ) -> bool:
-        values = self.origin_sheet.get_all_values()[1:]  # skip header
+        if not weekly:
+            charts = ChartSet(self.target_sheet, [self.definition(graph_pos_row, graph_pos_col)])
+            return charts.create_charts(service, spreadsheet_id, plan)
+
+        all_values = self.origin_sheet.get_all_values()
+        values = all_values[1:]  # skip header
         if not values:
             print("No data available.")
             return False
 
-        if not weekly:
-            x_range, y_range, range_info = get_contiguous_ranges(self.origin_sheet, self.x_column, self.y_column)
-            if not x_range or not y_range:
-                print("No valid contiguous data range found.")
-                return False
-
-            y_min, y_max = compute_y_axis_window(self.origin_sheet, range_info)
-            existing_id = find_existing_chart_id(service, spreadsheet_id, self.chart_name)
-
-            if existing_id:
-                update_request = build_chart_request(
-                    chart_id=existing_id,
-                    chart_name=self.chart_name,
-                    chart_type=self.chart_type,
-                    x_range=x_range,
-                    y_range=y_range,
-                    y_min=y_min,
-                    y_max=y_max,
-                    update=True
-                )
-                return execute_request(service, spreadsheet_id, update_request, self.chart_name)
-
-            chart_request = build_chart_request(
-                chart_name=self.chart_name,
-                chart_type=self.chart_type,
-                x_range=x_range,
-                y_range=y_range,
-                y_min=y_min,
-                y_max=y_max,
-                target_sheet_id=self.target_sheet.id,
-                graph_pos_row=graph_pos_row,
-                graph_pos_col=graph_pos_col
-            )
-            return execute_request(service, spreadsheet_id, chart_request, self.chart_name)
-
         # Weekly charts
         weekly_data = split_data_by_week(values, self.x_column, self.y_column)
         if not weekly_data:
@@ -75,14 +55,16 @@ class Chart:
 
         # Horizontal weekly charts
         col_spacing = 4  # number of columns between charts
+        existing_ids = find_existing_chart_ids(service, spreadsheet_id)
+        requests = []
         for x_range, y_range, week_start, week_end, week_num in weekly_data:
             range_info = {"y_col": y_range["startColumnIndex"]}
-            y_min, y_max = compute_y_axis_window(self.origin_sheet, range_info)
+            y_min, y_max = compute_y_axis_window(self.origin_sheet, range_info, values=all_values)
 
             chart_col = graph_pos_col + (week_num - 1) * col_spacing  
             chart_name = "Week "+str(week_num)+" : "+str(week_start).replace("-","/")+" - "+str(week_end).replace("-","/")
-            existing_id = find_existing_chart_id(service, spreadsheet_id, chart_name)
-            
+            existing_id = existing_ids.get(chart_name.lower())
+
             if existing_id:
                 update_request = build_chart_request(
                     chart_id=existing_id,
@@ -96,7 +78,7 @@ class Chart:
                     height_pixels=400,
                     update=True
                 )
-                execute_request(service, spreadsheet_id, update_request, chart_name)
+                requests.append(update_request)
             else:
                 chart_request = build_chart_request(
                     chart_name=chart_name,
@@ -111,5 +93,101 @@ class Chart:
                     graph_pos_row=graph_pos_row,  # same row
                     graph_pos_col=chart_col
                 )
-                execute_request(service, spreadsheet_id, chart_request, chart_name)
+                requests.append(chart_request)
+        return execute_requests(service, spreadsheet_id, requests, self.chart_name, plan)
+
+    # Declarative definition of this chart, placed at the given position (for ChartSet)
+    def definition(self, graph_pos_row, graph_pos_col):
+        return {
+            "chart_name": self.chart_name,
+            "chart_type": self.chart_type,
+            "origin_sheet": self.origin_sheet,
+            "x_column": self.x_column,
+            "y_column": self.y_column,
+            "row": graph_pos_row,
+            "col": graph_pos_col,
+            **self.options
+        }
+
+# Set of charts created or updated together
+class ChartSet:
+    """
+    Takes a declarative list of chart definitions, dicts with the keys:
+        chart_name, chart_type, origin_sheet, x_column, y_column, row, col
+    x_column/y_column are column letters ("D", "AB") or 0-based indices (e.g. SheetSchema.index).
+    and optionally y_axis_title, width and height (pixels).
+    Every range and y-window is computed from one snapshot per origin sheet, every
+    existing chart id is resolved with one metadata read, and all add/update specs
+    are sent in one batchUpdate, so ten charts cost the same API calls as one.
+    The batchUpdate is skipped when its requests are the same as the last one sent
+    (hash kept in CHARTS_STATE_FILE), so unchanged charts cost no write.
+    """
+    def __init__(self, target_sheet, definitions):
+        self.target_sheet = target_sheet
+        self.definitions = definitions
+
+    # Build the add/update request of every chart with data
+    def build_requests(self, existing_ids):
+        snapshots = {}
+        requests = []
+        for definition in self.definitions:
+            origin_sheet = definition["origin_sheet"]
+            if origin_sheet.id not in snapshots:
+                snapshots[origin_sheet.id] = origin_sheet.get_all_values()
+            values = snapshots[origin_sheet.id]
+
+            chart_name = definition["chart_name"]
+            ranges = get_contiguous_ranges(
+                origin_sheet, definition["x_column"], definition["y_column"], values=values
+            )
+            if not ranges:
+                print(f"No valid contiguous data range found for chart '{chart_name}'.")
+                continue
+            x_range, y_range, range_info = ranges
+            y_min, y_max = compute_y_axis_window(origin_sheet, range_info, values=values)
+
+            options = {
+                "chart_name": chart_name,
+                "chart_type": definition["chart_type"].upper(),
+                "x_range": x_range,
+                "y_range": y_range,
+                "y_min": y_min,
+                "y_max": y_max,
+                "width_pixels": definition.get("width", 800),
+                "height_pixels": definition.get("height", 400)
+            }
+            if "y_axis_title" in definition:
+                options["y_axis_title"] = definition["y_axis_title"]
+
+            existing_id = existing_ids.get(chart_name.strip().lower())
+            if existing_id:
+                requests.append(build_chart_request(chart_id=existing_id, update=True, **options))
+            else:
+                requests.append(build_chart_request(
+                    target_sheet_id=self.target_sheet.id,
+                    graph_pos_row=definition["row"],
+                    graph_pos_col=definition["col"],
+                    **options
+                ))
+        return requests
+
+    # Create or update all charts of the set with one batchUpdate
+    def create_charts(self, service, spreadsheet_id, plan=None) -> bool:
+        requests = self.build_requests(find_existing_chart_ids(service, spreadsheet_id))
+        if not requests:
+            print("No data available.")
+            return False
+        names = ", ".join(definition["chart_name"] for definition in self.definitions)
+
+        digest = requests_hash(requests)
+        sent = load_json(CHARTS_STATE_FILE, {})
+        if sent.get(str(self.target_sheet.id)) == digest:
+            print(f"Charts unchanged, nothing to update: {names}")
+            return True
+
+        if not execute_requests(service, spreadsheet_id, requests, names, plan):
+            return False
+        if plan is None:
+            sent[str(self.target_sheet.id)] = digest
+            save_json(CHARTS_STATE_FILE, sent)
         return True
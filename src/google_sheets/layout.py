@@ -0,0 +1,180 @@
+import json
+import re
+from googleapiclient.errors import HttpError
+from .sheet_utils import ACTIVITY_TABLES_START_ROW, build_activity_metrics, get_last_activity_row
+
+LAYOUT_METADATA_KEY = "activity_layout"
+MAX_TRACKED_TABLES = 365  # developer metadata is capped at 30k characters per sheet
+
+DATE_CELL_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}$")
+
+# Layout cursor of the activity tables, persisted as developer metadata on the graphs sheet
+class LayoutCursor:
+    """
+    Keeps the next free row/column of the activity tables and a map of the tables
+    already placed ({"2025-09-16 07:30": [row, col]}), so that finding the insertion
+    point and checking for duplicates needs no grid read.
+    Each run starts a new band of tables below the previous one; a band wraps to a
+    new band when it runs out of columns.
+    row/col are 1-based (like in Google Sheets).
+    """
+    def __init__(self, service, spreadsheet_id, sheet, start_row=ACTIVITY_TABLES_START_ROW, start_col=1, col_step=3, row_gap=2, max_col=None):
+        self.service = service
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet = sheet
+        self.start_row = start_row
+        self.start_col = start_col
+        self.col_step = col_step
+        self.row_gap = row_gap
+        self.max_col = max_col or sheet.col_count
+
+        self.next_row = start_row
+        self.next_col = start_col
+        self.tables = {}
+        self.metadata_id = None
+        self.dirty = False
+        self.band_bottom = None
+        self.replica = None
+
+    # Load the cursor from the local replica or the sheet metadata, bootstrapping it from the grid on first use
+    def load(self, replica=None):
+        """
+        With a `replica` (SheetReplica), the cursor is cached locally: only this
+        process writes the layout metadata, so the cached copy needs no API read.
+        The grid is only scanned when the metadata search succeeds with no match;
+        a failed search raises the HttpError.
+        """
+        self.replica = replica
+        cached = replica.get_meta(self.cache_key()) if replica else None
+        if cached:
+            self.metadata_id = cached["metadata_id"]
+            self.apply_state(cached["state"])
+            return self
+
+        try:
+            response = self.service.spreadsheets().developerMetadata().search(
+                spreadsheetId=self.spreadsheet_id,
+                body={"dataFilters": [{
+                    "developerMetadataLookup": {
+                        "metadataKey": LAYOUT_METADATA_KEY,
+                        "metadataLocation": {"sheetId": self.sheet.id}
+                    }
+                }]}
+            ).execute()
+        except HttpError as e:
+            # no answer isn't "no metadata": bootstrapping now would save a second layout entry
+            print(f"Error reading layout metadata: {e}")
+            raise
+
+        matches = response.get("matchedDeveloperMetadata", [])
+        if not matches:
+            self.bootstrap()
+            return self
+
+        metadata = matches[0]["developerMetadata"]
+        self.metadata_id = metadata["metadataId"]
+        self.apply_state(json.loads(metadata.get("metadataValue", "{}")))
+        if replica:
+            replica.set_meta(self.cache_key(), {"metadata_id": self.metadata_id, "state": self.state()})
+        return self
+
+    def cache_key(self):
+        return f"layout:{self.sheet.id}"
+
+    def apply_state(self, state):
+        self.next_row = state.get("next_row", self.start_row)
+        self.next_col = state.get("next_col", self.start_col)
+        self.tables = state.get("tables", {})
+
+    def state(self):
+        recent = sorted(self.tables)[-MAX_TRACKED_TABLES:]
+        return {
+            "next_row": self.next_row,
+            "next_col": self.next_col,
+            "tables": {key: self.tables[key] for key in recent}
+        }
+
+    # One-off scan of the grid for sheets created before the cursor existed
+    def bootstrap(self):
+        self.next_row = get_last_activity_row(self.sheet, self.start_row) + self.row_gap
+        self.next_col = self.start_col
+
+        values = self.sheet.get_all_values()
+        for r, row in enumerate(values, start=1):
+            for c, val in enumerate(row[1:], start=2):
+                if row[c - 2] == "Date" and DATE_CELL_PATTERN.match(val.strip()):
+                    self.tables[val.strip()] = [r - 1, c - 1]  # table starts at the header above
+        self.dirty = True
+
+    # Check whether a table for the given activity start date is already placed
+    def contains(self, start_date):
+        return start_date in self.tables
+
+    # Reserve the position of the next table and record it in the occupancy map
+    def place(self, activity):
+        height = len(build_activity_metrics(activity)) + 1  # +1 for header
+
+        if self.band_bottom is not None and self.next_col + 1 > self.max_col:
+            # wrap to a new band below the current one
+            self.next_row = self.band_bottom + self.row_gap
+            self.next_col = self.start_col
+            self.band_bottom = None
+
+        row, col = self.next_row, self.next_col
+        self.band_bottom = max(self.band_bottom or 0, row + height - 1)
+        self.next_col += self.col_step
+        self.tables[activity.start_date] = [row, col]
+        self.dirty = True
+        return row, col
+
+    # Persist the cursor; the next run starts a new band below the tables placed now
+    def save(self, plan=None):
+        if not self.dirty:
+            return True
+
+        if self.band_bottom is not None:
+            self.next_row = self.band_bottom + self.row_gap
+            self.next_col = self.start_col
+            self.band_bottom = None
+
+        value = json.dumps(self.state(), separators=(",", ":"))
+
+        if self.metadata_id is None:
+            request = {
+                "createDeveloperMetadata": {
+                    "developerMetadata": {
+                        "metadataKey": LAYOUT_METADATA_KEY,
+                        "metadataValue": value,
+                        "location": {"sheetId": self.sheet.id},
+                        "visibility": "DOCUMENT"
+                    }
+                }
+            }
+        else:
+            request = {
+                "updateDeveloperMetadata": {
+                    "dataFilters": [{"developerMetadataLookup": {"metadataId": self.metadata_id}}],
+                    "developerMetadata": {"metadataValue": value},
+                    "fields": "metadataValue"
+                }
+            }
+
+        if plan is not None:
+            return plan.add("spreadsheets.batchUpdate", LAYOUT_METADATA_KEY, {"requests": [request]})
+
+        try:
+            response = self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={"requests": [request]}
+            ).execute()
+        except HttpError as e:
+            print(f"Failed to save layout metadata: {e}")
+            return False
+
+        if self.metadata_id is None:
+            created = response.get("replies", [{}])[0].get("createDeveloperMetadata", {})
+            self.metadata_id = created.get("developerMetadata", {}).get("metadataId")
+        if self.replica:
+            self.replica.set_meta(self.cache_key(), {"metadata_id": self.metadata_id, "state": self.state()})
+        self.dirty = False
+        return True
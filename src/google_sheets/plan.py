@@ -0,0 +1,55 @@
+import json
+import math
+from quota import scheduler
+
+SHEETS_WRITE_REQUESTS_PER_MINUTE = 60
+
+# Collects the writes of a run instead of executing them (plan mode)
+class WritePlan:
+    """
+    Every helper that writes to the spreadsheet accepts an optional `plan`.
+    When given, the helper records the API call it would make here and returns as if it succeeded.
+    """
+    def __init__(self):
+        self.writes = []
+
+    # Record one write API call
+    def add(self, kind, target, payload):
+        self.writes.append({"kind": kind, "target": target, "payload": payload})
+        return True
+
+    # Counts and estimated quota cost of the recorded writes (and of the reads already made)
+    def summary(self):
+        by_kind = {}
+        sub_requests = 0
+        cells = 0
+        for write in self.writes:
+            by_kind[write["kind"]] = by_kind.get(write["kind"], 0) + 1
+            payload = write["payload"]
+            sub_requests += len(payload.get("requests", [])) or 1
+            for value_range in payload.get("data", [payload]):
+                cells += sum(len(row) for row in value_range.get("values", []))
+            # cells of the table insertions
+            for request in payload.get("requests", []):
+                rows = request.get("updateCells", {}).get("rows", [])
+                cells += sum(len(row.get("values", [])) for row in rows)
+
+        # a real run makes the same reads plus the recorded writes
+        calls = dict(scheduler.calls)
+        calls[("sheets", "write")] = calls.get(("sheets", "write"), 0) + len(self.writes)
+
+        return {
+            "write_calls": len(self.writes),
+            "by_kind": by_kind,
+            "sub_requests": sub_requests,
+            "cells": cells,
+            "estimated_quota": {
+                "sheets_write_requests": len(self.writes),
+                "minutes_of_write_quota": math.ceil(len(self.writes) / SHEETS_WRITE_REQUESTS_PER_MINUTE),
+                "calls": {".".join(key): n for key, n in calls.items()},
+                "estimated_seconds": round(scheduler.estimate_seconds(calls), 1)
+            }
+        }
+
+    def to_json(self):
+        return json.dumps({"summary": self.summary(), "writes": self.writes}, indent=2, ensure_ascii=False, default=str)
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from googleapiclient.errors import HttpError
+from gspread.utils import a1_range_to_grid_range, numericise_all, to_records
+from local_state import state_path
+from quota import scheduler
+
+REPLICA_FILE = "replica.sqlite3"
+# A full re-pull is forced after this many seconds, even if the version didn't change
+REPLICA_MAX_AGE = int(os.environ.get("REPLICA_MAX_AGE", "3600"))
+
+# Helper to hash a row of values
+def row_hash(row):
+    return hashlib.blake2b(json.dumps(row, ensure_ascii=False).encode(), digest_size=8).hexdigest()
+
+# Helper to apply an update of a range to rows of values in place, returns the indices of the rows changed
+def apply_range(rows, range_name, values):
+    grid = a1_range_to_grid_range(range_name)
+    changed = []
+    for i, new_row in enumerate(values):
+        idx = grid.get("startRowIndex", 0) + i
+        while len(rows) <= idx:
+            rows.append([""] * (len(rows[0]) if rows else 0))
+        row = rows[idx]
+        for j, val in enumerate(new_row):
+            col = grid.get("startColumnIndex", 0) + j
+            row.extend([""] * (col + 1 - len(row)))
+            row[col] = str(val)
+        changed.append(idx)
+    return changed
+
+# Local SQLite replica of the spreadsheet, kept in sync through the Drive file version
+class SheetReplica:
+    """
+    Keeps the values of the replicated sheets (Sheet1) and the activity table index
+    of the graphs sheet in a local SQLite file.
+    A sheet is pulled again only when the Drive version of the spreadsheet changed
+    (or the copy is older than REPLICA_MAX_AGE); only the rows whose hash changed are
+    rewritten locally. Reads in between are served from the replica.
+    """
+    def __init__(self, gs, path=None):
+        self.gs = gs
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path or state_path(REPLICA_FILE), check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS rows (
+                sheet TEXT, idx INTEGER, hash TEXT, cells TEXT,
+                PRIMARY KEY (sheet, idx)
+            );
+        """)
+        self.remote = None
+        self.synced = {}  # sheet title -> version it was synced at in this run
+        self.writes_at_start = scheduler.calls[("sheets", "write")]
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    # Version of the spreadsheet, from the Drive metadata (once per run)
+    def remote_version(self, refresh=False):
+        if self.remote is None or refresh:
+            try:
+                self.remote = self.gs.drive.files().get(
+                    fileId=self.gs.spreadsheet_id,
+                    fields="version"
+                ).execute()
+            except HttpError as e:
+                print(f"Error reading spreadsheet version: {e}")
+                self.remote = {}
+        return self.remote
+
+    # Check whether the local copy of a sheet matches the remote spreadsheet
+    def is_fresh(self, title):
+        synced = self.get_meta(f"synced:{title}")
+        version = self.remote_version().get("version")
+        return bool(synced) and version is not None and synced["version"] == version \
+            and time.time() - synced["at"] < REPLICA_MAX_AGE
+
+    # Pull a sheet if the remote copy changed, returns the number of rows rewritten locally
+    def sync(self, sheet):
+        if self.is_fresh(sheet.title):
+            self.synced[sheet.title] = self.remote_version().get("version")
+            return 0
+        return self.pull(sheet.title)
+
+    # Pull all values of a sheet, recorded as synced at the version read before them
+    def pull(self, title):
+        # a change made after the version was read shows up as a newer version on the next run
+        version = self.remote_version().get("version")
+        values = self.gs.service.spreadsheets().values().get(
+            spreadsheetId=self.gs.spreadsheet_id,
+            range=f"'{title}'"
+        ).execute().get("values", [])
+        # the API trims trailing empty cells, pad like gspread's get_all_values
+        width = max((len(row) for row in values), default=0)
+        values = [row + [""] * (width - len(row)) for row in values]
+
+        with self.lock, self.db:
+            local = dict(self.db.execute("SELECT idx, hash FROM rows WHERE sheet = ?", (title,)))
+            changed = []
+            for idx, row in enumerate(values):
+                digest = row_hash(row)
+                if local.get(idx) != digest:
+                    changed.append((title, idx, digest, json.dumps(row, ensure_ascii=False)))
+            self.db.executemany("INSERT OR REPLACE INTO rows (sheet, idx, hash, cells) VALUES (?, ?, ?, ?)", changed)
+            self.db.execute("DELETE FROM rows WHERE sheet = ? AND idx >= ?", (title, len(values)))
+
+        self.set_meta(f"synced:{title}", {"version": version, "at": time.time()})
+        self.synced[title] = version
+        return len(changed)
+
+    # All rows of a replicated sheet
+    def values(self, title):
+        with self.lock:
+            rows = self.db.execute("SELECT cells FROM rows WHERE sheet = ? ORDER BY idx", (title,)).fetchall()
+        return [json.loads(cells) for (cells,) in rows]
+
+    # Apply our own update of a range to the local copy as well
+    def write_through(self, title, range_name, values):
+        rows = self.values(title)
+        changed = [
+            (title, idx, row_hash(rows[idx]), json.dumps(rows[idx], ensure_ascii=False))
+            for idx in apply_range(rows, range_name, values)
+        ]
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO rows (sheet, idx, hash, cells) VALUES (?, ?, ?, ?)", changed)
+
+    # Bring the replica up to date after a run that wrote to the spreadsheet
+    def refresh_after_writes(self):
+        """
+        The new version can't tell our own writes from an edit someone made during
+        the run (lastModifyingUser only names the last editor), so the synced sheets
+        are pulled again when the version changed. The next run then finds them fresh.
+        A run that sent no Sheets write skips the check: an edit made meanwhile shows up
+        as a new version on the next run.
+        """
+        if scheduler.calls[("sheets", "write")] == self.writes_at_start:
+            return
+        before = self.remote_version().get("version")
+        if self.remote_version(refresh=True).get("version") == before:
+            return
+        for title in list(self.synced):
+            self.pull(title)
+
+    # Read-only view of a sheet served from the replica
+    def snapshot(self, sheet):
+        self.sync(sheet)
+        return ReplicaSheet(self, sheet)
+
+# Worksheet served from the replica; reads are local, writes go to the real sheet and through to the replica
+class ReplicaSheet:
+    def __init__(self, replica, sheet):
+        self.replica = replica
+        self.sheet = sheet
+        self.cached = None
+
+    def __getattr__(self, name):
+        return getattr(self.sheet, name)
+
+    def get_all_values(self):
+        if self.cached is None:
+            self.cached = self.replica.values(self.sheet.title)
+        return [list(row) for row in self.cached]
+
+    def get_all_records(self, head=1):
+        values = self.get_all_values()
+        if len(values) < head:
+            return []
+        keys = values[head - 1]
+        return to_records(keys, [numericise_all(row) for row in values[head:]])
+
+    def row_values(self, row):
+        values = self.get_all_values()
+        if len(values) < row:
+            return []
+        cells = values[row - 1]
+        while cells and cells[-1] == "":
+            cells.pop()  # trimmed like the API
+        return cells
+
+    # Ranges of the cached values, like Worksheet.batch_get (row or column major)
+    def batch_get(self, ranges, major_dimension="ROWS"):
+        values = self.get_all_values()
+        result = []
+        for range_name in ranges:
+            grid = a1_range_to_grid_range(range_name)
+            rows = [
+                row[grid.get("startColumnIndex", 0):grid.get("endColumnIndex")]
+                for row in values[grid.get("startRowIndex", 0):grid.get("endRowIndex")]
+            ]
+            if major_dimension == "COLUMNS":
+                width = max((len(row) for row in rows), default=0)
+                rows = [[row[i] if i < len(row) else "" for row in rows] for i in range(width)]
+            # trailing empty cells and lines are trimmed like the API
+            rows = [row[:max((i + 1 for i, cell in enumerate(row) if cell != ""), default=0)] for row in rows]
+            while rows and not rows[-1]:
+                rows.pop()
+            result.append(rows)
+        return result
+
+    # Apply a planned update to the values read by this run only (plan mode), the replica is left untouched
+    def apply_planned(self, range_name, values):
+        rows = self.get_all_values()
+        apply_range(rows, range_name, values)
+        self.cached = rows
+
+    def update(self, *args, **kwargs):
+        response = self.sheet.update(*args, **kwargs)
+        range_name = kwargs.get("range_name") or next(arg for arg in args if isinstance(arg, str))
+        values = kwargs.get("values") or next(arg for arg in args if isinstance(arg, list))
+        self.replica.write_through(self.sheet.title, range_name, values)
+        self.cached = None
+        return response
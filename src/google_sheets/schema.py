@@ -0,0 +1,99 @@
+import hashlib
+import json
+from gspread.utils import rowcol_to_a1
+from local_state import load_json, save_json
+
+SCHEMA_STATE_FILE = "sheet_schema.json"
+
+# Accepted header names of each Sheet1 field (compared case-insensitively)
+FIELD_ALIASES = {
+    "date": ("Ημερομηνία", "Date"),
+    "gym": ("Γυμναστήριο", "Gym"),
+    "treadmill": ("Διάδρομος", "Treadmill"),
+    "weight": ("Βάρος", "Weight"),
+    "sleep": ("Ύπνος", "Sleep"),
+    "water": ("Νερό", "Water"),
+}
+
+# Raised when a field needed by a run has no column in the header
+class SheetSchemaError(Exception):
+    pass
+
+# Helper to get the column letter of a 0-based column index
+def column_letter(index):
+    return rowcol_to_a1(1, index + 1)[:-1]
+
+# Helper to hash a header row
+def header_hash(header):
+    return hashlib.blake2b(json.dumps(header, ensure_ascii=False).encode(), digest_size=8).hexdigest()
+
+# Column mapping of Sheet1, detected from its header row
+class SheetSchema:
+    """
+    Maps the field names of FIELD_ALIASES to the 0-based column index of their header.
+    Fields whose header is missing are left out; asking for one raises SheetSchemaError.
+    """
+    def __init__(self, header, columns, title="Sheet1"):
+        self.header = header
+        self.columns = columns
+        self.title = title
+
+    @classmethod
+    def detect(cls, header, title="Sheet1"):
+        names = [str(name).strip().lower() for name in header]
+        columns = {}
+        for field, aliases in FIELD_ALIASES.items():
+            for alias in aliases:
+                if alias.lower() in names:
+                    columns[field] = names.index(alias.lower())
+                    break
+        return cls(header, columns, title)
+
+    # Whether the header has a column for a field
+    def has(self, field):
+        return field in self.columns
+
+    # 0-based column index of a field
+    def index(self, field):
+        if field not in self.columns:
+            aliases = " / ".join(f"'{alias}'" for alias in FIELD_ALIASES[field])
+            raise SheetSchemaError(
+                f"No {aliases} column found in the header of '{self.title}': {self.header}. "
+                f"Rename the header of the {field} column back to one of these names."
+            )
+        return self.columns[field]
+
+    # Column letter of a field, e.g. "D"
+    def letter(self, field):
+        return column_letter(self.index(field))
+
+    # Pick the columns of the given fields from full rows (missing cells as "")
+    def select(self, rows, *fields):
+        indices = [self.index(field) for field in fields]
+        return [[row[i] if len(row) > i else "" for i in indices] for row in rows]
+
+# Load the schema of a sheet from its header row, detecting the columns again only when the header changed
+def load_sheet_schema(sheet):
+    header = sheet.row_values(1)
+    digest = header_hash(header)
+
+    cache = load_json(SCHEMA_STATE_FILE, {})
+    cached = cache.get(str(sheet.id))
+    if cached and cached["hash"] == digest:
+        return SheetSchema(header, cached["columns"], sheet.title)
+
+    schema = SheetSchema.detect(header, sheet.title)
+    cache[str(sheet.id)] = {"hash": digest, "columns": schema.columns}
+    save_json(SCHEMA_STATE_FILE, cache)
+    return schema
+
+# Read only the columns of the given fields, returns the data rows (header skipped) in field order
+def read_columns(sheet, schema, *fields):
+    letters = [schema.letter(field) for field in fields]
+    columns = sheet.batch_get([f"{letter}:{letter}" for letter in letters], major_dimension="COLUMNS")
+    columns = [column[0] if column else [] for column in columns]
+    height = max((len(column) for column in columns), default=0)
+    return [
+        [column[i] if i < len(column) else "" for column in columns]
+        for i in range(1, height)
+    ]
@@ -1,35 +1,46 @@
 import gspread
+from datetime import date, datetime
 from gspread_formatting import *
 import pandas as pd
+from .replica import ReplicaSheet
+from .schema import load_sheet_schema, read_columns
+
+# First row of the activity tables on the graphs sheet (below the charts)
+ACTIVITY_TABLES_START_ROW = 21
+
+# Sheet1 fields of the lookup, besides the date: the ones matching needs, and the ones left empty without a header
+LOOKUP_FIELDS = ("gym", "treadmill")
+OPTIONAL_LOOKUP_FIELDS = ("weight", "sleep", "water")
 
 # Utility functions for Google Sheets operations
-def fix_format_of_sheet_data(sheet):
+def fix_format_of_sheet_data(sheet, plan=None, schema=None):
     """
     Cleans Sheet1 data in-place:
-    - Column A: proper date format (yyyy-mm-dd) if it's a date
-    - Column D: numeric weight (float) if it exists
+    - Date column: proper date format (yyyy-mm-dd) if it's a date
+    - Weight column: numeric weight (float) if it exists
     Leaves other columns untouched, and preserves non-date rows like month names.
+    Only the date and weight columns are read; their position comes from the header (`schema`).
     Returns True if successful, False if an error occurred.
+    With a `plan`, the updates are recorded instead of written, and applied to the
+    values of the run when `sheet` is served from the replica.
     """
     try:
-        data = sheet.get_all_values()
-        if not data or len(data) < 2:
+        schema = schema or load_sheet_schema(sheet)
+        rows = read_columns(sheet, schema, "date", "weight")
+        if not rows:
             return False
 
-        # Skip header
-        rows = data[1:]
-
         # Prepare lists for batch update
         date_updates = []
         weight_updates = []
 
-        for i, row in enumerate(rows):
+        for date_cell, weight_cell in rows:
             # Default values (no change)
-            date_to_write = row[0] if len(row) > 0 else ""
-            weight_to_write = row[3] if len(row) > 3 else ""
+            date_to_write = date_cell
+            weight_to_write = weight_cell
 
-            # --- Clean Date (Column A) if it's a date ---
-            date_val = row[0].strip() if len(row) > 0 else ""
+            # --- Clean Date if it's a date ---
+            date_val = date_cell.strip()
             try:
                 if "/" in date_val:
                     date = pd.to_datetime(date_val, format="%d/%m/%y", errors='raise')
@@ -39,8 +50,8 @@ def fix_format_of_sheet_data(sheet):
             except Exception as e:
                 pass  # leave original (could be month name or invalid)
 
-            # --- Clean Weight (Column D) ---
-            weight_val = row[3].replace(",", ".").strip() if len(row) > 3 else ""
+            # --- Clean Weight ---
+            weight_val = weight_cell.replace(",", ".").strip()
             try:
                 weight = float(weight_val)
                 weight_to_write = f"{weight:.1f}"
@@ -50,44 +61,65 @@ def fix_format_of_sheet_data(sheet):
             date_updates.append([date_to_write])
             weight_updates.append([weight_to_write])
 
-        # Batch update dates in column A
-        sheet.update(f"A2:A{len(date_updates)+1}", date_updates)
-        # Batch update weights in column D
-        sheet.update(f"D2:D{len(weight_updates)+1}", weight_updates)
+        # Only write the columns that actually changed
+        updates = []
+        date_col, weight_col = schema.letter("date"), schema.letter("weight")
+        if date_updates != [[date_cell] for date_cell, _ in rows]:
+            updates.append((f"{date_col}2:{date_col}{len(date_updates)+1}", date_updates))
+        if weight_updates != [[weight_cell] for _, weight_cell in rows]:
+            updates.append((f"{weight_col}2:{weight_col}{len(weight_updates)+1}", weight_updates))
+
+        for range_name, values in updates:
+            if plan is not None:
+                plan.add("values.update", sheet.title, {"range": range_name, "values": values})
+                # the later stages of the plan read the formatted values, like in a real run
+                if isinstance(sheet, ReplicaSheet):
+                    sheet.apply_planned(range_name, values)
+            else:
+                # Batch update the whole column
+                sheet.update(range_name, values)
 
         return True
     except Exception as e:
         print(f"Error cleaning sheet data: {e}")
         return False
 
+# Helper to parse a date cell of the sheet (yyyy-mm-dd, or dd/mm/yy before formatting)
+def parse_sheet_date(value):
+    value = str(value).strip()
+    try:
+        if "/" in value:
+            return datetime.strptime(value, "%d/%m/%y").date()
+        return date.fromisoformat(value)
+    except ValueError:
+        return None  # month names, empty cells
+
 # Helper to get a lookup dict from the sheet data
-def build_sheet_lookup(sheet):
+def build_sheet_lookup(sheet, schema=None):
     """
-    Builds a dict:
+    Builds a dict indexed by date:
     {
-        "2025-09-16": { "gym": "...", "treadmill": "...", "weight": "...", "sleep": "...", "water": "..." },
+        date(2025, 9, 16): { "gym": "...", "treadmill": "...", "weight": "...", "sleep": "...", "water": "..." },
     }
+    The columns are found by their header (`schema`). A missing date, gym or treadmill
+    header raises SheetSchemaError; the other fields are "" when their header is missing.
     """
-    data = sheet.get_all_records()
+    schema = schema or load_sheet_schema(sheet)
+    fields = LOOKUP_FIELDS + tuple(field for field in OPTIONAL_LOOKUP_FIELDS if schema.has(field))
     lookup = {}
 
-    for row in data:
-        date = str(row.get("Ημερομηνία")).strip()
-        if not date or date == "nan":
+    for row_date, *values in read_columns(sheet, schema, "date", *fields):
+        row_date = parse_sheet_date(row_date)
+        if row_date is None:
             continue
 
-        lookup[date] = {
-            "gym": (row.get("Γυμναστήριο") or "").strip(),
-            "treadmill": (row.get("Διάδρομος") or "").strip(),
-            "weight": (row.get("Βάρος") or "").strip(),
-            "sleep": (row.get("Ύπνος") or "").strip(),
-            "water": (row.get("Νερό") or "").strip(),
-        }
+        lookup[row_date] = dict.fromkeys(OPTIONAL_LOOKUP_FIELDS, "")
+        lookup[row_date].update((field, value.strip()) for field, value in zip(fields, values))
 
     return lookup
 
 # Helper to ensure or create a sheet
-def ensure_or_create_sheet(spreadsheet, sheet_name: str) -> bool:
+def ensure_or_create_sheet(spreadsheet, sheet_name: str, plan=None) -> bool:
     """
     Ensures that a sheet with `sheet_name` exists in the spreadsheet.
     If it exists, do nothing. If not, create it.
@@ -101,14 +133,37 @@ def ensure_or_create_sheet(spreadsheet, sheet_name: str) -> bool:
             return True  # Sheet already exists
         except gspread.exceptions.WorksheetNotFound:
             # Sheet doesn't exist, create it
+            if plan is not None:
+                return plan.add("spreadsheet.add_worksheet", sheet_name, {"title": sheet_name, "rows": 1000, "cols": 1000})
             spreadsheet.add_worksheet(title=sheet_name, rows="1000", cols="1000")
             return True
     except Exception as e:
         print(f"Error ensuring/creating sheet '{sheet_name}': {e}")
         return False
 
+# Helper to get the (label, value) rows of an activity table
+def build_activity_metrics(activity):
+    # Determine metrics dynamically
+    metrics = [
+        ("Date", activity.start_date),
+        ("Duration", activity.duration),
+        ("Avg HR", f"{activity.avg_hr or 0:.0f} bpm"),
+        ("Max HR", f"{activity.max_hr or 0:.0f} bpm"),
+        ("Calories", f"{activity.calories or 0:.0f}")
+    ]
+
+    # Add distance for treadmill/run activities
+    if activity.distance is not None:
+        metrics.insert(4, ("Distance", f"{activity.distance/1000:.2f} km"))
+
+    # Add pace when it was computed from the activity streams
+    if activity.pace:
+        metrics.insert(5, ("Pace", f"{int(activity.pace // 60)}:{int(activity.pace % 60):02d} /km"))
+
+    return metrics
+
 # Helper to insert an activity table
-def insert_activity_table(sheet, row, col, activity):
+def insert_activity_table(sheet, row, col, activity, plan=None):
     """
     Insert an activity as a 2-column table starting at (row, col) in the given sheet.
     Uses batch_update to minimize API calls. Applies formatting: column widths, header color, text alignment, borders.
@@ -116,19 +171,7 @@ def insert_activity_table(sheet, row, col, activity):
     """
     from gspread.utils import rowcol_to_a1
 
-    # Determine metrics dynamically
-    metrics = [
-        ("Date", activity.get("Start Date", "")),
-        ("Duration", activity.get("Duration", "")),
-        ("Avg HR", f"{activity.get('Heart Rate Avg', 0):.0f} bpm"),
-        ("Max HR", f"{activity.get('Heart Rate Max', 0):.0f} bpm"),
-        ("Calories", f"{activity.get('Calories', 0):.0f}")
-    ]
-
-    # Add distance for treadmill/run activities
-    if "Distance" in activity:
-        metrics.insert(4, ("Distance", f"{activity['Distance']/1000:.2f} km"))
-
+    metrics = build_activity_metrics(activity)
     num_rows = len(metrics)
 
     # SheetId is required for batchUpdate
@@ -139,7 +182,7 @@ def insert_activity_table(sheet, row, col, activity):
     c = col - 1
 
     # Determine header color
-    if "Distance" in activity:
+    if activity.distance is not None:
         header_color = {"red": 1, "green": 1, "blue": 0.6}  # light yellow for treadmill
     else:
         header_color = {"red": 0.8, "green": 0.9, "blue": 1}  # light blue for gym
@@ -186,7 +229,7 @@ def insert_activity_table(sheet, row, col, activity):
             },
             "rows": [{
                 "values": [{
-                    "userEnteredValue": {"stringValue": activity.get("Name", "Activity")},
+                    "userEnteredValue": {"stringValue": activity.name or "Activity"},
                     "userEnteredFormat": {
                         "backgroundColor": header_color,
                         "horizontalAlignment": "CENTER",
@@ -257,13 +300,17 @@ def insert_activity_table(sheet, row, col, activity):
     })
 
     # Execute all at once
+    if plan is not None:
+        plan.add("spreadsheets.batchUpdate", sheet.title, {"requests": requests})
+        return
     sheet.spreadsheet.batch_update({"requests": requests})
 
 # Helper to get the last activity row
-def get_last_activity_row(sheet, start_row=43):
+def get_last_activity_row(sheet, start_row=ACTIVITY_TABLES_START_ROW):
     """
     Returns the row index where the last activity table ends.
     Looks for the last non-empty row in column 1 starting from start_row.
+    Only used to bootstrap the LayoutCursor of sheets that have no layout metadata yet.
     """
     # Get all values in column A
     col_values = sheet.col_values(1)  # 1-based indexing for gspread
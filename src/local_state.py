@@ -0,0 +1,31 @@
+import json
+import os
+
+# Directory for the state kept between runs (mounted in the container)
+STATE_DIR = os.environ.get("STATE_DIR", os.path.join(os.path.dirname(__file__), "data"))
+
+# Helper to get a path inside the state directory
+def state_path(*parts):
+    path = os.path.join(STATE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+# Helper to load a JSON state file, returns `default` if it doesn't exist yet
+def load_json(name, default=None):
+    path = state_path(name)
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading state file '{name}': {e}")
+        return default
+
+# Helper to save a JSON state file atomically (a crash never leaves a half-written file)
+def save_json(name, data):
+    path = state_path(name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
@@ -1,101 +1,371 @@
-from google_sheets import GoogleSheetAuth,Chart,ensure_or_create_sheet,build_sheet_lookup,fix_format_of_sheet_data,insert_activity_table,get_last_activity_row
-from strava import get_activities_from_strava_api, matched_activities_from_sheet
+from google_sheets import GoogleSheetAuth,ChartSet,ensure_or_create_sheet,build_sheet_lookup,fix_format_of_sheet_data,insert_activity_table,LayoutCursor,WritePlan,SheetReplica,SheetSchema,load_sheet_schema
+from strava import Activity, get_activities_from_strava_api, matched_activities_from_sheet
+from strava.dates import local_today
+from analytics import update_derived_sheet, derived_tables
+from charts_helpers import render_dashboard
+from profiling import RunProfiler, stage
+from run_journal import RunJournal
+from contextlib import nullcontext
 from datetime import datetime, timezone
-import os
+import argparse
+import asyncio
 import os
 import sys
 import traceback
 
+#file name of the whole sheet
+google_sheet_file_name = os.environ.get("GOOGLE_SHEET_FILE")
+
+#the name of the graph sheet to ensure/create/use
+graphs_sheet_name = os.environ.get("GRAPHS_SHEET_NAME")
+
+#the name of the sheet with the derived analytics (rolling averages, weekly totals)
+derived_sheet_name = os.environ.get("DERIVED_SHEET_NAME", "derived")
+
+#directory of the profiling reports for --profile without DIR (the ./profile mount in the container)
+default_profile_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "profile"))
+
+#directory of the offline HTML dashboard, not rendered if unset
+dashboard_dir = os.environ.get("DASHBOARD_DIR")
+
 def log(msg: str):
     """Minimal timestamped log with UTC timezone."""
     timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
     print(f"[{timestamp}] {msg}")
 
-if __name__ == "__main__":
-    try:
-        #file name of the whole sheet
-        google_sheet_file_name = os.environ.get("GOOGLE_SHEET_FILE")
-
-        #the name of the graph sheet to ensure/create/use
-        graphs_sheet_name = os.environ.get("GRAPHS_SHEET_NAME")
-
-        # 1. Connect to Google Sheet
-        gs = GoogleSheetAuth("/app/src/credentials/google_creds.json", google_sheet_file_name)
-        sheet1 = gs.get_sheet()  
-        #get a lookup dictionary for activities names from sheet1
-        lookup = build_sheet_lookup(sheet1)
-        
-        # 2. Fix format of Sheet1 data
-        if not fix_format_of_sheet_data(sheet1):
-            log(f"Failed to format data in sheet.")
-
-        # 3. Ensure 'graphs' sheet exists
-        if not ensure_or_create_sheet(gs.spreadsheet, graphs_sheet_name):
-            log(f"Failed to create {graphs_sheet_name} sheet.")
-
-        graphs_sheet = gs.spreadsheet.worksheet(graphs_sheet_name)
-
-        # 4. Create Weight to Date graph
-        weight_to_date_graph = Chart(
-            chart_type="line",
-            chart_name="Weight over Time",
-            chart_style="smooth",
-            origin_sheet=sheet1,
-            target_sheet=graphs_sheet,
-            x_column="A",
-            y_column="D"
+# Run a stage through the journal, recording whether it succeeded
+def run_stage(journal, name, fn, *args, inputs=None):
+    """
+    With `inputs`, the stage is skipped (returning None) when the interrupted run of
+    today completed it with the same inputs, e.g. after a failure in a later stage.
+    """
+    if inputs is not None and journal.done(name, inputs):
+        log(f"Skipping stage '{name}', completed by the interrupted run with the same inputs.")
+        return None
+    with journal.stage(name, inputs):
+        result = fn(*args)
+    if result is False:
+        journal.fail(name, "the stage reported a failure")
+    return result
+
+# Helper to get the inputs of the stages writing from Sheet1 and the matched activities, for the journal
+def stage_inputs(sheet1, matched_activities):
+    return {
+        "sheet1": sheet1.get_all_values(),
+        "activities": [[getattr(activity, field) for field in Activity.__slots__] for activity in matched_activities],
+    }
+
+# Open Sheet1 through the local replica, pulled again only when the spreadsheet changed
+@stage("open_main_sheet")
+def open_main_sheet(gs, replica):
+    """
+    Returns (sheet1, schema), the schema maps the fields to the columns found in the header.
+    """
+    sheet1 = replica.snapshot(gs.get_sheet())
+    replica.set_meta("main_sheet", sheet1.title)  # for the offline dashboard
+    return sheet1, load_sheet_schema(sheet1)
+
+# Stage: fix the format of Sheet1 and ensure the output sheets
+@stage("prepare_sheets")
+def prepare_sheets(gs, sheet1, schema, plan=None, journal=None):
+    """
+    Returns (graphs_sheet, derived_sheet). In plan mode a sheet that doesn't exist
+    yet is returned as None, since nothing can be planned on it.
+    """
+    journal = journal or RunJournal(enabled=False)
+    # 2. Fix format of Sheet1 data
+    inputs = {"sheet1": sheet1.get_all_values()}
+    if run_stage(journal, "fix_format", fix_format_of_sheet_data, sheet1, plan, schema, inputs=inputs) is False:
+        log(f"Failed to format data in sheet.")
+
+    # 3. Ensure 'graphs' and derived sheets exist
+    sheets = []
+    existing = [ws.title for ws in gs.spreadsheet.worksheets()] if plan is not None else None
+    for sheet_name in (graphs_sheet_name, derived_sheet_name):
+        if not ensure_or_create_sheet(gs.spreadsheet, sheet_name, plan):
+            log(f"Failed to create {sheet_name} sheet.")
+        if existing is not None and sheet_name not in existing:
+            log(f"'{sheet_name}' sheet doesn't exist yet, nothing can be planned on it.")
+            sheets.append(None)
+        else:
+            sheets.append(gs.spreadsheet.worksheet(sheet_name))
+    return tuple(sheets)
+
+# Stage: fetch recent activities from Strava
+@stage("fetch_activities")
+def fetch_activities():
+    #getting the last 5 activities from strava api
+    return get_activities_from_strava_api(limit=5)
+
+# Stage: match the activities with the names of the sheet (one Strava detail call per activity)
+@stage("match_activities")
+def match_activities(activities, lookup):
+    """
+    Consumes the `activities` list of Strava summaries: each raw payload is released as
+    soon as its Activity is built, and the caller is left with an empty list.
+    """
+    activities.reverse()
+    return matched_activities_from_sheet((activities.pop() for _ in range(len(activities))), lookup)
+
+# Stage: insert today's activity tables into the 'graphs' sheet
+@stage("insert_tables")
+def insert_tables(gs, graphs_sheet, matched_activities, plan=None, replica=None, journal=None):
+    """
+    Each inserted table is committed to the `journal` with its activity start date as key,
+    so a retry after a failure doesn't insert it twice.
+    """
+    journal = journal or RunJournal(enabled=False)
+    #today's date in the activities timezone
+    today = local_today()
+
+    # the layout cursor keeps the next free position and the tables already placed
+    layout = LayoutCursor(gs.service, gs.spreadsheet_id, graphs_sheet).load(replica)
+    added_count = 0
+
+    for activity in matched_activities:
+        # Skip if not today's activity
+        if activity.local_date != today:
+            continue
+
+        # Skip if activity already exists
+        if layout.contains(activity.start_date):
+            log(f"Skipping duplicate activity: '{activity.name}' at {activity.start_date}")
+            continue
+
+        # placed again on a retry, so the cursor moves past the tables already inserted
+        row, col = layout.place(activity)
+        key = f"table:{activity.start_date}"
+        if journal.committed(key):
+            log(f"Table of '{activity.name}' at {activity.start_date} already inserted by the interrupted run.")
+            continue
+
+        insert_activity_table(sheet=graphs_sheet, row=row, col=col, activity=activity, plan=plan)
+        journal.commit(key, {"cell": [row, col]})
+        added_count += 1
+
+    if not layout.save(plan):
+        log(f"Failed to save the activity layout of '{graphs_sheet_name}'.")
+
+    return added_count
+
+# Stage: update the derived analytics sheet
+@stage("update_derived")
+def update_derived(gs, sheet1, schema, derived_sheet, matched_activities, plan=None):
+    if not update_derived_sheet(gs.service, gs.spreadsheet_id, sheet1, derived_sheet, matched_activities, plan, schema):
+        log(f"Failed to update derived data in '{derived_sheet_name}' sheet.")
+        return False
+    return True
+
+# Charts of the 'graphs' sheet, add a definition here to chart another column
+def chart_definitions(sheet1, schema, derived_sheet):
+    charts = [
+        {"chart_name": "Weight over Time", "chart_type": "line", "origin_sheet": sheet1,
+         "x_column": schema.index("date"), "y_column": schema.index("weight"), "row": 0, "col": 0},
+    ]
+    if derived_sheet is not None:
+        charts.append(
+            {"chart_name": "Weight 7-day average", "chart_type": "line", "origin_sheet": derived_sheet,
+             "x_column": "A", "y_column": "C", "row": 0, "col": 9}
         )
+    return charts
+
+# Stage: create or update all charts with one batchUpdate
+@stage("draw_charts")
+def draw_charts(gs, sheet1, schema, graphs_sheet, derived_sheet, plan=None):
+    charts = ChartSet(graphs_sheet, chart_definitions(sheet1, schema, derived_sheet))
+    if not charts.create_charts(gs.service, gs.spreadsheet_id, plan):
+        log(f"Failed to insert charts into '{graphs_sheet_name}' sheet.")
+        return False
+    return True
+
+# Charts of the offline dashboard, computed from local data only
+def dashboard_definitions(sheet1_values):
+    schema = SheetSchema.detect(sheet1_values[0] if sheet1_values else [])
+    daily, weekly = derived_tables(sheet1_values)
+    return [
+        {"chart_name": "Weight over Time", "values": sheet1_values,
+         "x_column": schema.index("date"), "y_column": schema.index("weight")},
+        {"chart_name": "Weight 7-day average", "values": daily, "x_column": "A", "y_column": "C"},
+        {"chart_name": "Weekly training duration", "values": weekly, "x_column": "A", "y_column": "B",
+         "y_axis_title": "Duration (h)"},
+    ]
+
+# Stage: render the offline HTML dashboard from the replica and the activity history
+@stage("render_dashboard")
+def render_local_dashboard(sheet1_values):
+    path = os.path.join(dashboard_dir, "index.html")
+    if render_dashboard(dashboard_definitions(sheet1_values), path, title=google_sheet_file_name or "Dashboard"):
+        log(f"Dashboard written to '{path}'.")
+    else:
+        log(f"Failed to write dashboard '{path}'.")
+
+# Render the dashboard without any API call, from the data cached by the last run
+def run_dashboard():
+    replica = SheetReplica(None)
+    title = replica.get_meta("main_sheet")
+    if title is None:
+        log("No local replica found, run the pipeline once first.")
+        return
+    render_local_dashboard(replica.values(title))
+
+# Stage: write everything that needs both the sheets and the activities
+def write_results(gs, sheet1, schema, graphs_sheet, derived_sheet, matched_activities, plan=None, replica=None, journal=None):
+    journal = journal or RunJournal(enabled=False)
+    added_count = 0
+    # stages completed by an interrupted run with the same Sheet1 values and activities are skipped
+    inputs = stage_inputs(sheet1, matched_activities)
+    # 6. Insert activity tables into 'graphs' sheet (tables are also committed one by one)
+    if graphs_sheet is not None:
+        added_count = run_stage(
+            journal, "insert_tables", insert_tables, gs, graphs_sheet, matched_activities, plan, replica, journal,
+            inputs=inputs
+        ) or 0
 
-        #weekly charts
-        #if not weight_to_date_graph.create_chart(gs.service, gs.spreadsheet_id, 0, 0, weekly=True):
-        #    print(f"Failed to create weekly charts.")
-        
-        #total charts
-        if not weight_to_date_graph.create_chart(gs.service, gs.spreadsheet_id, 0, 0):
-            log(f"Failed to insert chart '{weight_to_date_graph.chart_name}' into sheet.")
-
-        # 5. Fetch recent activities from Strava and create activity tables
-        #getting the last 2 activities from strava api
-        activities = get_activities_from_strava_api(limit=5)
-        #matching them with the activities name from the sheet for that specific date
-        matched_activities = matched_activities_from_sheet(activities, lookup)
-        
-        #today's date
-        today = datetime.now(timezone.utc).date()
-
-        # Insert activity tables into 'graphs' sheet
-        starting_col = 1
-        col_step = 3  # space between tables
-        next_table_row = get_last_activity_row(graphs_sheet,21) + 2  # leave a gap of 1 row
-        added_count = 0
-
-        #get existing dates to avoid duplicates
-        #existing_dates_of_activities = [cell.value for cell in graphs_sheet.range("B1:B1000") if cell.value]
-        existing_dates_of_activities = [
-            cell.value
-            for cell in graphs_sheet.range("B1:B1000") + graphs_sheet.range("E1:E1000")
-            if cell.value
-        ]
-
-        for activity in matched_activities:
-            activity_date = datetime.fromisoformat(activity.get("Start Date")).date()
-
-            # Skip if not today's activity
-            if activity_date != today:
-                continue
-
-            # Skip if activity already exists
-            if activity.get("Start Date") in existing_dates_of_activities:
-                log(f"Skipping duplicate activity: '{activity.get('Name')}' at {activity.get('Start Date')}")
-                continue
-
-            col = starting_col + added_count * col_step
-            insert_activity_table(sheet=graphs_sheet, row=next_table_row, col=col, activity=activity)
-            added_count += 1
+    # 7. Update derived analytics sheet
+    if derived_sheet is not None:
+        run_stage(journal, "update_derived", update_derived, gs, sheet1, schema, derived_sheet, matched_activities, plan,
+                  inputs=inputs)
 
+    # 8. Create or update the charts, once the derived data is written
+    # (the Sheet1 charts too, so all of them stay in one batchUpdate rather than overlapping the Strava chain)
+    if graphs_sheet is not None:
+        run_stage(journal, "draw_charts", draw_charts, gs, sheet1, schema, graphs_sheet, derived_sheet, plan,
+                  inputs=inputs)
+
+    if plan is None:
+        if replica is not None:
+            replica.refresh_after_writes()
+        if dashboard_dir:
+            render_local_dashboard(sheet1.get_all_values())
         log(f"'{graphs_sheet_name}' sheet of '{google_sheet_file_name}' file updated. {added_count} activity table(s) added.")
+    if not journal.finish():
+        if journal.enabled:
+            log(f"Run finished with failed stage(s), the next run of today resumes at '{journal.failed_stage()}'.")
+        else:
+            log(f"Run finished with failed stage(s), first failed stage: '{journal.failed_stage()}'.")
+    return added_count
+
+# Open the run journal, resuming the interrupted run of today if there is one
+def open_journal(plan=None):
+    journal = RunJournal(enabled=plan is None)
+    if journal.resumed:
+        log(f"Resuming the interrupted run of today, completed stages: {', '.join(journal.completed()) or 'none'}.")
+    return journal
+
+def run(plan=None, journal=None):
+    """
+    Runs the whole pipeline stage after stage. With a `plan` (WritePlan), all reads
+    are executed but every write is recorded in the plan instead of being sent.
+    The `journal` (RunJournal) records the stages and writes done, to resume after a failure.
+    """
+    journal = journal or open_journal(plan)
+    # 1. Connect to Google Sheet
+    gs = GoogleSheetAuth("/app/src/credentials/google_creds.json", google_sheet_file_name)
+    # Sheet1 is read from the local replica, pulled again only when the spreadsheet changed
+    replica = SheetReplica(gs)
+    sheet1, schema = open_main_sheet(gs, replica)
+    #get a lookup dictionary for activities names from sheet1
+    lookup = build_sheet_lookup(sheet1, schema)
+
+    graphs_sheet, derived_sheet = prepare_sheets(gs, sheet1, schema, plan, journal)
+
+    # 5. Fetch recent activities from Strava and match them with the activities name from the sheet for that specific date
+    with journal.stage("fetch_activities"):
+        activities = fetch_activities()
+    with journal.stage("match_activities"):
+        matched_activities = match_activities(activities, lookup)
+
+    return write_results(gs, sheet1, schema, graphs_sheet, derived_sheet, matched_activities, plan, replica, journal)
+
+async def run_async(plan=None, journal=None):
+    """
+    Same pipeline as `run`, with the Sheets chain (lookup, format, output sheets) and the
+    Strava chain (fetch, match) running concurrently in worker threads. They are
+    joined where data depends on it: matching waits for the lookup, and the
+    tables/derived stage waits for both chains.
+    Each client (gspread session, Sheets service, Strava requests) is only used
+    by one chain at a time.
+    """
+    journal = journal or open_journal(plan)
+    # 1. Connect to Google Sheet
+    gs = await asyncio.to_thread(GoogleSheetAuth, "/app/src/credentials/google_creds.json", google_sheet_file_name)
+    replica = SheetReplica(gs)
+    sheet1, schema = await asyncio.to_thread(open_main_sheet, gs, replica)
+    lookup_task = asyncio.create_task(asyncio.to_thread(build_sheet_lookup, sheet1, schema))
+
+    async def sheets_chain():
+        await lookup_task  # the lookup reads Sheet1 before it is reformatted
+        return await asyncio.to_thread(prepare_sheets, gs, sheet1, schema, plan, journal)
+
+    async def strava_chain():
+        with journal.stage("fetch_activities"):
+            activities = await asyncio.to_thread(fetch_activities)
+        lookup = await lookup_task
+        with journal.stage("match_activities"):
+            return await asyncio.to_thread(match_activities, activities, lookup)
+
+    (graphs_sheet, derived_sheet), matched_activities = await asyncio.gather(sheets_chain(), strava_chain())
+
+    return await asyncio.to_thread(write_results, gs, sheet1, schema, graphs_sheet, derived_sheet, matched_activities, plan, replica, journal)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the Google Sheet with charts and Strava activity tables.")
+    parser.add_argument(
+        "--plan",
+        nargs="?",
+        const="plan.json",
+        default=os.environ.get("PLAN_FILE"),
+        metavar="FILE",
+        help="compute the full write set without writing anything and save it as JSON to FILE"
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        default=os.environ.get("ASYNC_PIPELINE", "0") == "1",
+        help="run the Sheets and Strava stages concurrently"
+    )
+    parser.add_argument(
+        "--dashboard",
+        action="store_true",
+        help="only render the HTML dashboard into DASHBOARD_DIR from the locally cached data, with no network access"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=default_profile_dir,
+        default=os.environ.get("PROFILE_DIR"),
+        metavar="DIR",
+        help="profile the run (cProfile, sampled stacks, tracemalloc per stage) and save the reports into DIR"
+    )
+    args = parser.parse_args()
+
+    journal = None
+    try:
+        if args.dashboard:
+            dashboard_dir = dashboard_dir or "dashboard"
+            run_dashboard()
+            sys.exit(0)
+
+        plan = WritePlan() if args.plan else None
+        journal = open_journal(plan)
+        with RunProfiler(args.profile) if args.profile else nullcontext():
+            if args.use_async:
+                asyncio.run(run_async(plan, journal))
+            else:
+                run(plan, journal)
 
+        if plan is not None:
+            with open(args.plan, "w") as f:
+                f.write(plan.to_json())
+            summary = plan.summary()
+            log(f"Plan saved to '{args.plan}': {summary['write_calls']} write call(s), {summary['cells']} cell(s).")
 
     except Exception:
-        log("Error occurred during execution:")
-        traceback.print_exc(file=sys.stdout)
\ No newline at end of file
+        failed_stage = journal.failed_stage() if journal is not None and journal.enabled else None
+        if failed_stage:
+            log(f"Run failed at stage '{failed_stage}', completed stages: {', '.join(journal.completed()) or 'none'}. "
+                f"The next run of today resumes there.")
+        else:
+            log("Error occurred during execution:")
+        traceback.print_exc(file=sys.stdout)
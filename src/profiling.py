@@ -0,0 +1,142 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Seconds between two stack samples of the collapsed-stack profile
+SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.005"))
+TOP_ALLOCATORS = 15
+TOP_FUNCTIONS = 40
+TRACEMALLOC_FRAMES = 1  # allocators are grouped by line, deeper tracebacks only slow the snapshots
+
+# Profiler of the running pipeline, None when not profiling
+active = None
+
+# Helper to label a frame of a collapsed stack
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+# Thread sampling the stacks of all other threads, for a flamegraph-compatible collapsed-stack file
+class StackSampler(threading.Thread):
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        names = {}
+        while not self.stopped.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                key = ";".join([names.get(ident, str(ident)), *reversed(stack)])
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    # One "frame;frame;frame count" line per distinct stack (input of flamegraph.pl, speedscope...)
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+# Profiles one run of the pipeline into `out_dir`
+class RunProfiler:
+    """
+    Wraps the run in cProfile (calling thread), a stack sampler (all threads) and
+    tracemalloc. On exit it writes, prefixed with the run timestamp:
+    - <run>.pstats: cProfile stats, to load with pstats or snakeviz
+    - <run>.txt: top functions by cumulative time
+    - <run>.collapsed: sampled stacks in the collapsed format of flamegraph tools
+    - <run>.memory.txt: top allocators of every stage (see `stage`) and the peak memory
+    Stages running concurrently (--async) share the allocations made in between.
+    """
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.run_name = "run-" + datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler()
+        self.stages = []
+        self.lock = threading.Lock()
+        self.started = None
+
+    def __enter__(self):
+        global active
+        active = self
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        global active
+        self.profile.disable()
+        self.sampler.stop()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        active = None
+        self.save(time.perf_counter() - self.started, peak)
+        return False
+
+    def snapshot(self):
+        return tracemalloc.take_snapshot()
+
+    # Record the duration and the top allocators of a stage (without the profiler's own)
+    def record_stage(self, name, seconds, before):
+        own = (tracemalloc.__file__, __file__)
+        stats = [
+            stat for stat in self.snapshot().compare_to(before, "lineno")
+            if stat.traceback[0].filename not in own
+        ][:TOP_ALLOCATORS]
+        with self.lock:
+            self.stages.append((name, seconds, stats))
+
+    def save(self, seconds, peak):
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, self.run_name)
+
+        self.profile.dump_stats(path + ".pstats")
+        report = io.StringIO()
+        pstats.Stats(self.profile, stream=report).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        with open(path + ".txt", "w") as f:
+            f.write(report.getvalue())
+
+        with open(path + ".collapsed", "w") as f:
+            f.write(self.sampler.collapsed())
+
+        with open(path + ".memory.txt", "w") as f:
+            f.write(f"Run: {seconds:.2f} s, peak traced memory: {peak / 1024 / 1024:.1f} MiB\n")
+            for name, stage_seconds, stats in self.stages:
+                f.write(f"\n== {name} ({stage_seconds:.2f} s), top {len(stats)} allocators ==\n")
+                f.writelines(f"{stat}\n" for stat in stats)
+
+        print(f"Profile of the run saved to '{path}.*'")
+
+# Mark a stage of the pipeline (context manager or decorator), a no-op when not profiling
+@contextmanager
+def stage(name):
+    profiler = active
+    if profiler is None:
+        yield
+        return
+    before = profiler.snapshot()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.record_stage(name, time.perf_counter() - started, before)
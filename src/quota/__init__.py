@@ -0,0 +1,10 @@
+from .scheduler import QuotaExceededError, QuotaScheduler, scheduler
+from .transport import throttle_session, throttle_http
+
+__all__ = [
+    "QuotaExceededError",
+    "QuotaScheduler",
+    "scheduler",
+    "throttle_session",
+    "throttle_http",
+]
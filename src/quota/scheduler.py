@@ -0,0 +1,181 @@
+import fcntl
+import math
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from local_state import load_json, save_json, state_path
+
+QUOTA_STATE_FILE = "quota.json"
+DAY = "day"
+
+# Longest a call waits for its quota before failing, below the 3 minutes between two cron runs
+QUOTA_MAX_WAIT = float(os.environ.get("QUOTA_MAX_WAIT", "120"))
+
+# Default limits per (api, operation class), as "capacity/seconds" or "capacity/day"
+# Override with env vars, e.g. QUOTA_STRAVA_READ="100/900,1000/day"
+DEFAULT_LIMITS = {
+    ("sheets", "read"): "60/60",
+    ("sheets", "write"): "60/60",
+    ("strava", "read"): "100/900,1000/day",
+}
+
+# Helper to parse a limits spec like "100/900,1000/day"
+def parse_limits(spec):
+    limits = []
+    for part in spec.split(","):
+        capacity, period = part.strip().split("/")
+        limits.append((int(capacity), DAY if period == DAY else float(period)))
+    return limits
+
+# Helper to get the configured limits (defaults overridden by env vars)
+def configured_limits():
+    return {
+        key: parse_limits(os.environ.get(f"QUOTA_{key[0].upper()}_{key[1].upper()}", spec))
+        for key, spec in DEFAULT_LIMITS.items()
+    }
+
+# Raised when a call would have to wait longer than the maximum wait, e.g. once the Strava daily budget is used up
+class QuotaExceededError(Exception):
+    pass
+
+# Token bucket refilling `capacity` tokens every `period` seconds
+class TokenBucket:
+    def __init__(self, capacity, period, tokens=None, updated=None):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity if tokens is None else tokens
+        self.updated = time.time() if updated is None else updated
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Seconds until `n` tokens are available
+    def wait_time(self, now, n=1):
+        self.refill(now)
+        return max(0.0, (n - self.tokens) / self.rate)
+
+    def take(self, now, n=1):
+        self.refill(now)
+        self.tokens -= n
+
+    def state(self):
+        return {"tokens": self.tokens, "updated": self.updated}
+
+    def restore(self, tokens, updated):
+        self.tokens, self.updated = min(self.capacity, tokens), updated
+
+# Calendar day budget (UTC), e.g. Strava's daily limit
+class DailyBudget:
+    def __init__(self, capacity, day=None, used=0):
+        self.capacity = capacity
+        self.day = day
+        self.used = used
+
+    def roll(self, now):
+        today = datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%d")
+        if self.day != today:
+            self.day, self.used = today, 0
+
+    # Seconds until `n` calls fit in the budget (spilling into the following days)
+    def wait_time(self, now, n=1):
+        self.roll(now)
+        if self.used + n <= self.capacity:
+            return 0.0
+        days = math.ceil((self.used + n - self.capacity) / self.capacity)
+        midnight = datetime.fromtimestamp(now, timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (midnight + timedelta(days=days)).timestamp() - now
+
+    def take(self, now, n=1):
+        self.roll(now)
+        self.used += n
+
+    def state(self):
+        return {"day": self.day, "used": self.used}
+
+    def restore(self, day, used):
+        self.day, self.used = day, used
+
+# Central scheduler every outbound Sheets/Strava call goes through
+class QuotaScheduler:
+    """
+    Holds the limits of every (api, operation class) and blocks a call until it fits
+    in all of them, so calls are queued instead of failing with 429.
+    The budgets are shared with the other processes (overlapping cron runs) through the
+    state file: every call reloads it, takes its tokens and saves it under a file lock.
+    A call that would wait more than `max_wait` seconds raises QuotaExceededError.
+    """
+    def __init__(self, limits=None, state_file=QUOTA_STATE_FILE, max_wait=QUOTA_MAX_WAIT):
+        self.state_file = state_file
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.calls = Counter()
+
+        self.limits = {}
+        for key, key_limits in (limits or configured_limits()).items():
+            self.limits[key] = [
+                DailyBudget(capacity) if period == DAY else TokenBucket(capacity, period)
+                for capacity, period in key_limits
+            ]
+        self.load()
+
+    # Block until a call of the given class is allowed, then count it
+    def acquire(self, api, operation):
+        key = (api, operation)
+        while True:
+            with self.lock, self.file_lock():
+                self.load()
+                now = time.time()
+                wait = max([limit.wait_time(now) for limit in self.limits.get(key, [])], default=0.0)
+                if wait <= 0:
+                    for limit in self.limits.get(key, []):
+                        limit.take(now)
+                    self.calls[key] += 1
+                    self.save()
+                    return
+            if wait > self.max_wait:
+                raise QuotaExceededError(
+                    f"{api} {operation} quota used up, the next call is allowed in {wait:.0f} s "
+                    f"(more than QUOTA_MAX_WAIT={self.max_wait:.0f} s)"
+                )
+            time.sleep(wait)
+
+    # Seconds a run with the given number of calls per (api, operation) would take
+    def estimate_seconds(self, counts):
+        with self.lock:
+            self.load()
+            now = time.time()
+            return max(
+                [limit.wait_time(now, n) for key, n in counts.items() for limit in self.limits.get(key, [])],
+                default=0.0
+            )
+
+    # Exclusive lock on the state file across processes
+    @contextmanager
+    def file_lock(self):
+        with open(state_path(self.state_file + ".lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # Load the budgets saved by the last call of any process
+    def load(self):
+        saved = load_json(self.state_file, {})
+        for key, key_limits in self.limits.items():
+            saved_limits = saved.get(".".join(key), [])
+            for limit, state in zip(key_limits, saved_limits):
+                limit.restore(**state)
+
+    # Save the budgets, the file lock must be held
+    def save(self):
+        save_json(self.state_file, {
+            ".".join(key): [limit.state() for limit in key_limits]
+            for key, key_limits in self.limits.items()
+        })
+
+scheduler = QuotaScheduler()
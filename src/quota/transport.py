@@ -0,0 +1,42 @@
+from urllib.parse import urlparse
+from .scheduler import scheduler
+
+# POST endpoints of the Sheets API that only read
+SHEETS_READ_SUFFIXES = (":batchGet", ":batchGetByDataFilter", ":getByDataFilter", "developerMetadata:search")
+
+# Helper to classify a Google API call into (api, operation class)
+def classify_google_call(method, url):
+    parsed = urlparse(url)
+    if parsed.netloc != "sheets.googleapis.com":
+        return None  # e.g. Drive lookups of the spreadsheet, not limited here
+    if method.upper() == "GET" or parsed.path.endswith(SHEETS_READ_SUFFIXES):
+        return "sheets", "read"
+    return "sheets", "write"
+
+# Route the calls of a requests session (used by gspread) through the scheduler
+def throttle_session(session):
+    request = session.request
+
+    def throttled_request(*args, **kwargs):
+        method = kwargs.get("method", args[0] if args else "GET")
+        url = kwargs.get("url", args[1] if len(args) > 1 else "")
+        key = classify_google_call(method, url)
+        if key:
+            scheduler.acquire(*key)
+        return request(*args, **kwargs)
+
+    session.request = throttled_request
+    return session
+
+# Route the calls of an httplib2 client (used by googleapiclient) through the scheduler
+def throttle_http(http):
+    request = http.request
+
+    def throttled_request(uri, method="GET", *args, **kwargs):
+        key = classify_google_call(method, uri)
+        if key:
+            scheduler.acquire(*key)
+        return request(uri, method, *args, **kwargs)
+
+    http.request = throttled_request
+    return http
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from local_state import load_json, save_json
+from strava.dates import local_today
+
+JOURNAL_FILE = "journal.json"
+
+# Helper to hash the inputs of a stage (any JSON-serializable value, datetimes as strings)
+def inputs_hash(inputs):
+    return hashlib.blake2b(json.dumps(inputs, sort_keys=True, default=str).encode(), digest_size=8).hexdigest()
+
+# Durable journal of a run: stages completed and write batches committed
+class RunJournal:
+    """
+    Saved atomically after every record, so it survives a crash at any point.
+    A run that fails (or is killed) leaves its journal open; the next run of the same
+    day resumes it: a stage recorded with the hash of its inputs is skipped when it was
+    completed with the same inputs (see `done`), and the writes committed under an
+    idempotency key, e.g. "table:<activity start date>", are not made again.
+    A run that finishes closes the journal, so the next one starts from scratch.
+    With `enabled=False` (plan mode) nothing is saved.
+    Records come from several threads with --async: every change and its
+    serialization happen under the lock.
+    """
+    def __init__(self, enabled=True, name=JOURNAL_FILE):
+        self.enabled = enabled
+        self.name = name
+        self.lock = threading.Lock()
+        today = local_today().isoformat()
+
+        saved = load_json(name, {}) if enabled else {}
+        self.resumed = saved.get("day") == today and saved.get("status") != "done"
+        self.data = saved if self.resumed else {"day": today, "stages": {}, "writes": {}}
+        with self.lock:
+            self.data.pop("failed_stage", None)
+            self.data["status"] = "running"
+            self.data["started"] = now()
+            self.save()
+
+    # Save the journal, the lock must be held
+    def save(self):
+        if self.enabled:
+            save_json(self.name, self.data)
+
+    # Whether a stage was completed with the same inputs, by this run or the interrupted one
+    def done(self, name, inputs):
+        with self.lock:
+            stage = self.data["stages"].get(name, {})
+            return stage.get("status") == "done" and stage.get("inputs") == inputs_hash(inputs)
+
+    # Record the outcome of a stage, failures are recorded with their error and raised again
+    @contextmanager
+    def stage(self, name, inputs=None):
+        with self.lock:
+            self.data["stages"][name] = {"status": "running", "at": now()}
+            self.save()
+        try:
+            yield
+        except Exception as e:
+            self.fail(name, f"{type(e).__name__}: {e}", raised=True)
+            raise
+        with self.lock:
+            self.data["stages"][name] = {"status": "done", "at": now()}
+            if inputs is not None:
+                self.data["stages"][name]["inputs"] = inputs_hash(inputs)
+            self.save()
+
+    # Record a failed stage, also for a stage reporting a failure without raising (a helper returning False)
+    def fail(self, name, error, raised=False):
+        with self.lock:
+            self.data["stages"][name] = {"status": "failed", "at": now(), "error": error}
+            self.data["status"] = "failed"
+            if raised:
+                self.data["failed_stage"] = name
+            else:
+                self.data.setdefault("failed_stage", name)
+            self.save()
+
+    # Info recorded with a committed write, None if it wasn't committed yet
+    def committed(self, key):
+        with self.lock:
+            return self.data["writes"].get(key)
+
+    def commit(self, key, info=None):
+        with self.lock:
+            self.data["writes"][key] = {"at": now(), **(info or {})}
+            self.save()
+
+    # Close the journal after a run whose stages all succeeded, returns False if one failed
+    def finish(self):
+        with self.lock:
+            if self.data["status"] != "failed":
+                self.data["status"] = "done"
+            self.save()
+            return self.data["status"] == "done"
+
+    # Names of the completed stages
+    def completed(self):
+        with self.lock:
+            return [name for name, stage in self.data["stages"].items() if stage["status"] == "done"]
+
+    def failed_stage(self):
+        with self.lock:
+            return self.data.get("failed_stage")
+
+# Helper to get the current UTC time as an ISO string
+def now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
@@ -1,10 +1,19 @@
-from .strava_api import get_activities_from_strava_api,get_activity_detail
+from .strava_api import get_activities_from_strava_api,get_activity_detail,get_activity_streams
+from .activity import Activity
 from .strava_utils import get_activity_name_from_sheet, return_activity_data, matched_activities_from_sheet
+from .streams_cache import get_or_fetch_streams, load_streams
+from .stream_metrics import hr_zone_seconds, average_pace
 
 __all__ = [
     "get_activities_from_strava_api",
+    "Activity",
     "return_activity_data",
     "get_activity_name_from_sheet",
     "get_activity_detail",
+    "get_activity_streams",
+    "get_or_fetch_streams",
+    "load_streams",
+    "hr_zone_seconds",
+    "average_pace",
     "matched_activituies_from_sheet"
-]
\ No newline at end of file
+]
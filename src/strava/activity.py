@@ -0,0 +1,49 @@
+# Helper to format seconds into HH:MM:SS
+def format_seconds(sec):
+    h = sec // 3600
+    m = (sec % 3600) // 60
+    s = sec % 60
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+# Compact record of an activity, keeping only the fields the pipeline uses
+class Activity:
+    """
+    Built right after a Strava payload is read, so the summary/detail JSON
+    (segment efforts, laps, maps...) can be dropped straight away.
+    `distance` is only set for runs and walks; `hr_zones` (seconds per zone) and
+    `pace` (seconds per km) only when the activity streams were fetched.
+    """
+    __slots__ = (
+        "id", "name", "start_utc", "start_local", "elapsed_time", "distance",
+        "avg_hr", "max_hr", "calories", "hr_zones", "pace"
+    )
+
+    def __init__(self, id, name, start_utc, start_local, elapsed_time, distance=None,
+                 avg_hr=None, max_hr=None, calories=None, hr_zones=None, pace=None):
+        self.id = id
+        self.name = name
+        self.start_utc = start_utc
+        self.start_local = start_local
+        self.elapsed_time = elapsed_time
+        self.distance = distance
+        self.avg_hr = avg_hr
+        self.max_hr = max_hr
+        self.calories = calories
+        self.hr_zones = hr_zones
+        self.pace = pace
+
+    # Display string of the start in local time, also the key of the activity tables
+    @property
+    def start_date(self):
+        return self.start_local.strftime("%Y-%m-%d %H:%M")
+
+    @property
+    def local_date(self):
+        return self.start_local.date()
+
+    @property
+    def duration(self):
+        return format_seconds(self.elapsed_time)
+
+    def __repr__(self):
+        return f"Activity(id={self.id}, name={self.name!r}, start={self.start_date})"
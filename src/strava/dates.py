@@ -0,0 +1,15 @@
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+# Timezone the activities are shown, matched and filtered in
+TIMEZONE = ZoneInfo(os.environ.get("TIMEZONE", "Europe/Athens"))
+
+# Helper to parse a Strava UTC timestamp once into typed UTC and local datetimes
+def parse_start_date(start_date, tz=TIMEZONE):
+    start_utc = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
+    return start_utc, start_utc.astimezone(tz)
+
+# Helper to get today's date in the activities timezone
+def local_today(tz=TIMEZONE):
+    return datetime.now(tz).date()
@@ -4,8 +4,13 @@ import configparser
 import os
 from zoneinfo import ZoneInfo
 from datetime import datetime
+from quota import scheduler
 
-CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "credentials", "strava_creds.ini")
+# Override with STRAVA_CREDS_FILE, e.g. for the tests
+CONFIG_PATH = os.environ.get(
+    "STRAVA_CREDS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "credentials", "strava_creds.ini")
+)
 config = configparser.ConfigParser()
 config.read(CONFIG_PATH)
 
@@ -15,6 +20,9 @@ ACCESS_TOKEN = config["STRAVA"]["access_token"]
 REFRESH_TOKEN = config["STRAVA"]["refresh_token"]
 EXPIRES_AT = int(config["STRAVA"]["expires_at"])
 
+# Seconds before a Strava request fails with a timeout instead of hanging the run
+REQUEST_TIMEOUT = 30
+
 # Save updated tokens back to ini
 def save_tokens():
     config["STRAVA"]["access_token"] = ACCESS_TOKEN
@@ -36,7 +44,8 @@ def refresh_token_if_needed():
                 "client_secret": CLIENT_SECRET,
                 "grant_type": "refresh_token",
                 "refresh_token": REFRESH_TOKEN
-            }
+            },
+            timeout=REQUEST_TIMEOUT
         )
         data = response.json()
         ACCESS_TOKEN = data["access_token"]
@@ -50,10 +59,12 @@ def refresh_token_if_needed():
 def get_activities_from_strava_api(limit=10):
     refresh_token_if_needed()
     headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
+    scheduler.acquire("strava", "read")
     response = requests.get(
         "https://www.strava.com/api/v3/athlete/activities",
         headers=headers,
-        params={"per_page": limit, "page": 1}
+        params={"per_page": limit, "page": 1},
+        timeout=REQUEST_TIMEOUT
     )
     if response.status_code != 200:
         print("Error fetching activities:", response.text)
@@ -64,11 +75,29 @@ def get_activities_from_strava_api(limit=10):
 def get_activity_detail(activity_id):
     refresh_token_if_needed()
     headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
+    scheduler.acquire("strava", "read")
     response = requests.get(
         f"https://www.strava.com/api/v3/activities/{activity_id}",
-        headers=headers
+        headers=headers,
+        timeout=REQUEST_TIMEOUT
     )
     if response.status_code != 200:
         print(f"Error fetching details for activity {activity_id}:", response.text)
         return {}
     return response.json()
+
+# Fetch the time series (streams) of an activity, None if the request failed
+def get_activity_streams(activity_id, keys=("time", "heartrate", "distance", "velocity_smooth")):
+    refresh_token_if_needed()
+    headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
+    scheduler.acquire("strava", "read")
+    response = requests.get(
+        f"https://www.strava.com/api/v3/activities/{activity_id}/streams",
+        headers=headers,
+        params={"keys": ",".join(keys), "key_by_type": "true"},
+        timeout=REQUEST_TIMEOUT
+    )
+    if response.status_code != 200:
+        print(f"Error fetching streams for activity {activity_id}:", response.text)
+        return None
+    return response.json()
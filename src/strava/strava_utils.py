@@ -1,19 +1,18 @@
-from datetime import datetime
-from zoneinfo import ZoneInfo   
+import os
 from strava import get_activity_detail
+from .dates import parse_start_date
+from .activity import Activity
+from .streams_cache import get_or_fetch_streams
+from .stream_metrics import hr_zone_seconds, average_pace
 
+# Optional ingestion of the activity streams (time, heartrate, distance, velocity)
+FETCH_STREAMS = os.environ.get("STRAVA_STREAMS", "0") == "1"
 
-# Helper to format seconds into HH:MM:SS
-def format_seconds(sec):
-    h = sec // 3600
-    m = (sec % 3600) // 60
-    s = sec % 60
-    return f"{h:02d}:{m:02d}:{s:02d}"
 
 # Helper to get activity name from sheet based on rules
 def get_activity_name_from_sheet(activity_date, strava_name, sheet_lookup):
     """
-    Returns the name of the activity from the sheet.
+    Returns the name of the activity from the sheet (`activity_date` is a date, like the lookup keys).
     - If Strava activity contains "Workout", return the 'gym' column.
     - If Strava activity contains "Run", return the 'treadmill' column.
     - Fall back to None if nothing matches or data is empty.
@@ -35,38 +34,50 @@ def get_activity_name_from_sheet(activity_date, strava_name, sheet_lookup):
     # fallback: return Strava name itself if sheet data empty
     return strava_name
 
-# Helper to extract and format the activity data we use
+# Helper to extract the activity data we use into a compact record
 def return_activity_data(activity):
+    """
+    Returns an Activity built from the Strava summary and detail payloads.
+    The detail payload is only held inside this function.
+    """
     detail = get_activity_detail(activity["id"])
-    calories = detail.get("calories") or detail.get("total_calories") or "N/A"
+    calories = detail.get("calories") or detail.get("total_calories")
+    del detail
+
+    # parsed once, everything downstream compares the typed values
+    start_utc, start_local = parse_start_date(activity["start_date"])
+    name = activity.get("name")
 
-    final_time = datetime.fromisoformat(activity["start_date"].replace("Z", "+00:00")) \
-                        .astimezone(ZoneInfo("Europe/Athens")) \
-                        .strftime("%Y-%m-%d %H:%M")
+    record = Activity(
+        id=activity.get("id"),
+        name=name,
+        start_utc=start_utc,
+        start_local=start_local,
+        elapsed_time=activity.get("elapsed_time"),
+        avg_hr=activity.get("average_heartrate"),
+        max_hr=activity.get("max_heartrate"),
+        calories=calories
+    )
 
-    activity_base = {
-        "Name": activity.get("name"),
-        "Start Date": final_time,#.isoformat(),  # store in local time
-        "Duration": format_seconds(activity.get("elapsed_time")),
-        "Heart Rate Avg": activity.get("average_heartrate"),
-        "Heart Rate Max": activity.get("max_heartrate"),
-        "Calories": calories
-    }
+    if ("Run" in name) or ("Walk" in name):
+        record.distance = activity.get("distance")
 
-    if ("Run" in activity.get("name")) or ("Walk" in activity.get("name")):
-        activity_base["Distance"] = activity.get("distance")
+    if FETCH_STREAMS:
+        streams = get_or_fetch_streams(activity["id"])
+        if streams is not None:
+            zones = hr_zone_seconds(streams)
+            record.hr_zones = tuple(zones) if zones else None
+            record.pace = average_pace(streams) if record.distance is not None else None
 
-    return activity_base
+    return record
 
 # Main function to match activities from Strava with names from the sheet
 def matched_activities_from_sheet(activities, lookup):
     matched = []
     for act in activities:
-        activity_data = return_activity_data(act)
-        act_date = datetime.fromisoformat(activity_data.get("Start Date").replace("Z", "")).strftime("%Y-%m-%d")
-        act_name = activity_data.get("Name")
-        activity_data["Name"] = get_activity_name_from_sheet(act_date, act_name, lookup)
-        matched.append(activity_data)
+        record = return_activity_data(act)
+        record.name = get_activity_name_from_sheet(record.local_date, record.name, lookup)
+        matched.append(record)
     return matched
 
 
@@ -0,0 +1,36 @@
+import numpy as np
+from zones import HR_MAX, HR_ZONE_EDGES, HR_ZONES
+from .streams_cache import stream_channel
+
+# Helper to compute the seconds spent in each HR zone from the streams of an activity
+def hr_zone_seconds(streams, hr_max=HR_MAX):
+    """
+    Returns a list with the seconds spent in each of HR_ZONES.
+    Each sample is weighted by the time until the next sample. Returns None without HR data.
+    """
+    time = stream_channel(streams, "time")
+    heartrate = stream_channel(streams, "heartrate")
+    if len(time) < 2 or np.isnan(heartrate).all():
+        return None
+
+    dt = np.diff(time)
+    hr = heartrate[:-1]
+    valid = ~np.isnan(hr)
+    zones = np.digitize(hr[valid] / hr_max, HR_ZONE_EDGES)
+    return np.bincount(zones, weights=dt[valid], minlength=len(HR_ZONES)).tolist()
+
+# Helper to compute the average pace (seconds per km) of the moving part of an activity
+def average_pace(streams, min_speed=0.5):
+    time = stream_channel(streams, "time")
+    distance = stream_channel(streams, "distance")
+    velocity = stream_channel(streams, "velocity_smooth")
+    if len(time) < 2 or np.isnan(distance).all():
+        return None
+
+    dt = np.diff(time)
+    moving = velocity[1:] >= min_speed if not np.isnan(velocity).all() else np.ones_like(dt, dtype=bool)
+    moving_time = dt[moving].sum()
+    total_distance = np.nanmax(distance) - np.nanmin(distance)
+    if moving_time <= 0 or total_distance <= 0:
+        return None
+    return float(moving_time / (total_distance / 1000))
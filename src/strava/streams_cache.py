@@ -0,0 +1,70 @@
+import os
+import numpy as np
+from local_state import state_path
+from .strava_api import get_activity_streams
+
+# Channel order of the cached arrays (one row per channel)
+STREAM_KEYS = ("time", "heartrate", "distance", "velocity_smooth")
+STREAMS_DIR = "streams"
+
+# Helper to get the cache file of an activity
+def streams_path(activity_id):
+    return state_path(STREAMS_DIR, f"{activity_id}.npy")
+
+# Helper to get the marker file of an activity without streams (e.g. a manual entry)
+def no_streams_path(activity_id):
+    return state_path(STREAMS_DIR, f"{activity_id}.none")
+
+# Helper to store the streams of an activity as a float32 (channels x samples) array
+def save_streams(activity_id, streams):
+    """
+    Stores the Strava streams response (key_by_type) as a compact .npy file.
+    Missing channels (e.g. no HR strap) are stored as NaN.
+    Returns the stored array, or None if the response has no time stream.
+    """
+    time = streams.get("time", {}).get("data")
+    if not time:
+        return None
+
+    array = np.full((len(STREAM_KEYS), len(time)), np.nan, dtype=np.float32)
+    for i, key in enumerate(STREAM_KEYS):
+        data = streams.get(key, {}).get("data")
+        if data and len(data) == len(time):
+            array[i] = data
+
+    path = streams_path(activity_id)
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(path + ".tmp", path)
+    return array
+
+# Helper to load the cached streams of an activity (memory-mapped, read-only)
+def load_streams(activity_id):
+    path = streams_path(activity_id)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode="r")
+
+# Helper to get the streams of an activity, downloading them only once
+def get_or_fetch_streams(activity_id):
+    """
+    Activities without a time stream are marked as such and never requested again.
+    A failed request isn't marked, so it is retried on the next run.
+    """
+    array = load_streams(activity_id)
+    if array is not None:
+        return array
+    if os.path.exists(no_streams_path(activity_id)):
+        return None
+
+    streams = get_activity_streams(activity_id, STREAM_KEYS)
+    if streams is None:
+        return None
+    if not isinstance(streams, dict) or save_streams(activity_id, streams) is None:
+        open(no_streams_path(activity_id), "w").close()
+        return None
+    return load_streams(activity_id)
+
+# Helper to get a single channel of a cached streams array
+def stream_channel(array, key):
+    return array[STREAM_KEYS.index(key)]
@@ -0,0 +1,9 @@
+import os
+
+# Heart rate zones as fractions of the maximum heart rate
+HR_MAX = float(os.environ.get("HR_MAX", "190"))
+HR_ZONE_EDGES = (0.6, 0.7, 0.8, 0.9)
+HR_ZONES = ["Z1", "Z2", "Z3", "Z4", "Z5"]
+
+# Columns of the activity history with the seconds spent in each zone
+ZONE_COLUMNS = [f"{zone.lower()}_time" for zone in HR_ZONES]
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# the app runs from src/ (imports like `from local_state import ...`)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import local_state
+
+# Dummy Strava credentials, read when the strava package is imported (never used for a request)
+os.environ.setdefault("STRAVA_CREDS_FILE", os.path.join(os.path.dirname(__file__), "strava_creds.ini"))
+
+
+# Every test gets its own state directory
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_state, "STATE_DIR", str(tmp_path))
+    return tmp_path
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from google_sheets.graph import ChartSet
+
+
+class FakeService:
+    """Sheets service with one existing chart, counting the batchUpdates."""
+    def __init__(self):
+        self.batch_updates = []
+
+    def spreadsheets(self):
+        return self
+
+    def get(self, **kwargs):
+        self.response = {"sheets": [{"charts": [{"chartId": 7, "spec": {"title": "Weight over Time"}}]}]}
+        return self
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.batch_updates.append(body["requests"])
+        self.response = {}
+        return self
+
+    def execute(self):
+        return self.response
+
+
+def weight_sheet(rows):
+    values = [["Date", "Weight"], *rows]
+    return SimpleNamespace(id=1, get_all_values=lambda: [list(row) for row in values])
+
+
+def chart_set(origin_sheet):
+    definitions = [{"chart_name": "Weight over Time", "chart_type": "line", "origin_sheet": origin_sheet,
+                    "x_column": 0, "y_column": 1, "row": 0, "col": 0}]
+    return ChartSet(SimpleNamespace(id=2), definitions)
+
+
+def test_unchanged_charts_are_not_sent_again():
+    service = FakeService()
+    rows = [["2025-09-15", "80.2"], ["2025-09-16", "80.0"]]
+
+    assert chart_set(weight_sheet(rows)).create_charts(service, "sid")
+    assert chart_set(weight_sheet(rows)).create_charts(service, "sid")
+    assert len(service.batch_updates) == 1
+
+    # a new row changes the ranges, so the spec is sent again
+    assert chart_set(weight_sheet(rows + [["2025-09-17", "79.8"]])).create_charts(service, "sid")
+    assert len(service.batch_updates) == 2
+    assert "updateChartSpec" in service.batch_updates[-1][0]
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from analytics.derived import update_derived_sheet
+
+
+class FakeOriginSheet:
+    """Sheet1 with a date and a weight column, read through batch_get."""
+    id = 1
+    title = "Sheet1"
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def row_values(self, row):
+        return self.rows[row - 1]
+
+    def batch_get(self, ranges, major_dimension=None):
+        columns = {"A": 0, "B": 1}
+        return [[[row[columns[r.split(":")[0]]] for row in self.rows]] for r in ranges]
+
+
+class FakeService:
+    """Sheets service recording values.batchUpdate bodies, failing with 429 while `fail` is set."""
+    def __init__(self):
+        self.fail = False
+        self.bodies = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.body = body
+        return self
+
+    def execute(self):
+        if self.fail:
+            raise HttpError(httplib2.Response({"status": 429}), b"rate limited")
+        self.bodies.append(self.body)
+        return {}
+
+
+def activity(activity_id, start, elapsed_time):
+    return SimpleNamespace(
+        id=activity_id, start_date=start, elapsed_time=elapsed_time,
+        distance=1000, calories=100, avg_hr=130, hr_zones=None
+    )
+
+
+def weekly_duration(body, week):
+    for value_range in body["data"]:
+        if "!F" in value_range["range"]:
+            for row in value_range["values"]:
+                if row[0] == week:
+                    return row[1]
+    return None
+
+
+def test_failed_write_is_recomputed_on_retry():
+    origin = FakeOriginSheet([["Date", "Weight"], ["2025-09-15", "80.0"], ["2025-09-16", "80.5"]])
+    derived = SimpleNamespace(id=2, title="derived", row_count=1000)
+    service = FakeService()
+    first = activity(1, "2025-09-15 07:00", 3600)
+    second = activity(2, "2025-09-17 07:00", 1800)
+
+    assert update_derived_sheet(service, "sid", origin, derived, [first])
+    assert weekly_duration(service.bodies[-1], "2025-09-15") == 1.0
+
+    # a second activity in the same week, the write fails with 429
+    service.fail = True
+    assert not update_derived_sheet(service, "sid", origin, derived, [first, second])
+
+    # the retry still sees the second activity as new and rewrites its week
+    service.fail = False
+    assert update_derived_sheet(service, "sid", origin, derived, [first, second])
+    assert weekly_duration(service.bodies[-1], "2025-09-15") == 1.5
+
+    # once written, nothing changed anymore
+    writes = len(service.bodies)
+    assert update_derived_sheet(service, "sid", origin, derived, [first, second])
+    assert len(service.bodies) == writes
@@ -0,0 +1,50 @@
+import pytest
+
+from main import run_stage
+from run_journal import RunJournal
+
+
+def test_retry_skips_the_work_committed_by_the_failed_run():
+    calls = []
+
+    def derived():
+        calls.append("derived")
+        return True
+
+    def charts():
+        calls.append("charts")
+        raise TimeoutError("Sheets timed out")
+
+    # the first run updates the derived sheet and one table, then fails on the charts
+    journal = RunJournal()
+    run_stage(journal, "update_derived", derived, inputs={"sheet1": [["2025-09-16"]]})
+    journal.commit("table:2025-09-16 07:30", {"cell": [21, 1]})
+    with pytest.raises(TimeoutError):
+        run_stage(journal, "draw_charts", charts, inputs={"sheet1": [["2025-09-16"]]})
+
+    retry = RunJournal()
+    assert retry.resumed and retry.failed_stage() is None
+    assert run_stage(retry, "update_derived", derived, inputs={"sheet1": [["2025-09-16"]]}) is None
+    assert retry.committed("table:2025-09-16 07:30")
+    with pytest.raises(TimeoutError):
+        run_stage(retry, "draw_charts", charts, inputs={"sheet1": [["2025-09-16"]]})
+    assert calls == ["derived", "charts", "charts"]
+    assert retry.failed_stage() == "draw_charts"
+
+
+def test_retry_runs_a_completed_stage_again_when_its_inputs_changed():
+    calls = []
+    journal = RunJournal()
+    run_stage(journal, "update_derived", lambda: calls.append(1) or True, inputs={"sheet1": [["2025-09-16", "80"]]})
+    journal.fail("draw_charts", "the stage reported a failure")
+
+    retry = RunJournal()
+    run_stage(retry, "update_derived", lambda: calls.append(2) or True, inputs={"sheet1": [["2025-09-16", "79.8"]]})
+    assert calls == [1, 2]
+
+
+def test_finished_run_closes_the_journal():
+    journal = RunJournal()
+    run_stage(journal, "update_derived", lambda: True, inputs={})
+    assert journal.finish()
+    assert not RunJournal().resumed
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from google_sheets.layout import LayoutCursor
+
+
+class FakeService:
+    """Sheets service answering the developer metadata search with `search` (a dict or an exception)."""
+    def __init__(self, search):
+        self.search_result = search
+        self.batch_updates = []
+
+    def spreadsheets(self):
+        return self
+
+    def developerMetadata(self):
+        return self
+
+    def search(self, spreadsheetId, body):
+        self.call = "search"
+        return self
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.call = "batchUpdate"
+        self.batch_updates.append(body)
+        return self
+
+    def execute(self):
+        if self.call == "batchUpdate":
+            return {"replies": [{"createDeveloperMetadata": {"developerMetadata": {"metadataId": 1}}}]}
+        if isinstance(self.search_result, Exception):
+            raise self.search_result
+        return self.search_result
+
+
+def graphs_sheet():
+    return SimpleNamespace(id=7, title="graphs", col_count=26, get_all_values=lambda: [], col_values=lambda col: [])
+
+
+def test_failed_metadata_search_does_not_bootstrap():
+    service = FakeService(HttpError(httplib2.Response({"status": 503}), b"unavailable"))
+    layout = LayoutCursor(service, "sid", graphs_sheet())
+
+    with pytest.raises(HttpError):
+        layout.load()
+    assert not layout.dirty
+    assert layout.save()
+    assert service.batch_updates == []
+
+
+def test_missing_metadata_bootstraps_and_creates_it():
+    service = FakeService({})
+    layout = LayoutCursor(service, "sid", graphs_sheet()).load()
+
+    assert layout.dirty
+    assert layout.save()
+    assert "createDeveloperMetadata" in service.batch_updates[0]["requests"][0]
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from google_sheets.plan import WritePlan
+from google_sheets.replica import ReplicaSheet
+from google_sheets.schema import SheetSchema, read_columns
+from google_sheets.sheet_utils import fix_format_of_sheet_data, insert_activity_table
+from strava.activity import Activity
+
+ROWS = [
+    ["Ημερομηνία", "Βάρος"],
+    ["15/09/25", "80,2"],
+    ["16/09/25", "80.0"],
+]
+
+
+class FakeReplica:
+    """Replica of Sheet1, only read in plan mode."""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def values(self, title):
+        return [list(row) for row in self.rows]
+
+    def write_through(self, *args):
+        raise AssertionError("plan mode must not change the replica")
+
+
+def test_planned_format_is_seen_by_later_stages():
+    replica = FakeReplica(ROWS)
+    sheet1 = ReplicaSheet(replica, SimpleNamespace(title="Sheet1", id=1))
+    schema = SheetSchema.detect(ROWS[0])
+    plan = WritePlan()
+
+    assert fix_format_of_sheet_data(sheet1, plan, schema)
+
+    assert [write["payload"]["range"] for write in plan.writes] == ["A2:A3", "B2:B3"]
+    assert read_columns(sheet1, schema, "date", "weight") == [["2025-09-15", "80.2"], ["2025-09-16", "80.0"]]
+    # the next run still reads the unformatted values from the replica
+    assert ReplicaSheet(replica, sheet1.sheet).get_all_values() == ROWS
+
+
+def test_summary_counts_the_cells_of_table_insertions():
+    graphs = SimpleNamespace(title="graphs", _properties={"sheetId": 2})
+    start = datetime(2025, 9, 16, 7, 30, tzinfo=timezone.utc)
+    activity = Activity(1, "Legs", start, start, 3600, avg_hr=130, max_hr=160, calories=400)
+    plan = WritePlan()
+
+    insert_activity_table(graphs, 21, 1, activity, plan)
+
+    # header cell + 5 metric rows of (label, value)
+    assert plan.summary()["cells"] == 1 + 5 * 2
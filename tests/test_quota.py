@@ -0,0 +1,30 @@
+import time
+
+import pytest
+
+import local_state
+from quota.scheduler import DAY, QuotaExceededError, QuotaScheduler
+
+
+def test_daily_budget_is_shared_and_fails_fast_when_used_up():
+    limits = {("strava", "read"): [(2, DAY)]}
+    # Two overlapping runs, both loaded before any call
+    first = QuotaScheduler(limits)
+    second = QuotaScheduler(limits)
+
+    first.acquire("strava", "read")
+    second.acquire("strava", "read")
+
+    started = time.monotonic()
+    with pytest.raises(QuotaExceededError):
+        first.acquire("strava", "read")
+    assert time.monotonic() - started < 1
+    assert local_state.load_json("quota.json")["strava.read"][0]["used"] == 2
+
+
+def test_short_waits_still_block():
+    scheduler = QuotaScheduler({("sheets", "write"): [(1, 0.2)]})
+    scheduler.acquire("sheets", "write")
+    started = time.monotonic()
+    scheduler.acquire("sheets", "write")
+    assert time.monotonic() - started >= 0.1
@@ -0,0 +1,82 @@
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from google_sheets.replica import SheetReplica
+from quota import scheduler
+
+
+@pytest.fixture(autouse=True)
+def calls(monkeypatch):
+    monkeypatch.setattr(scheduler, "calls", Counter())
+    return scheduler.calls
+
+
+class FakeGoogle:
+    """Drive version and Sheets values of a spreadsheet edited by the test."""
+    def __init__(self, values):
+        self.version = "1"
+        self.cells = values
+        self.pulls = 0
+        self.version_reads = 0
+        self.spreadsheet_id = "sid"
+        self.drive = self
+        self.service = self
+
+    # drive.files().get().execute() and service.spreadsheets().values().get().execute()
+    def files(self):
+        self.call = "version"
+        return self
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, **kwargs):
+        if kwargs.get("range"):
+            self.call = "values"
+        return self
+
+    def execute(self):
+        if self.call == "version":
+            self.version_reads += 1
+            return {"version": self.version}
+        self.pulls += 1
+        return {"values": [list(row) for row in self.cells]}
+
+
+def test_edit_during_run_is_pulled_after_own_writes(tmp_path, calls):
+    google = FakeGoogle([["Date", "Gym"], ["2025-09-16", ""]])
+    sheet = SimpleNamespace(title="Sheet1")
+    replica = SheetReplica(google, path=str(tmp_path / "replica.sqlite3"))
+    replica.sync(sheet)
+
+    # someone names the activity during the run, then our own writes bump the version again
+    google.cells[1][1] = "Legs"
+    calls[("sheets", "write")] += 1
+    google.version = "3"
+    replica.refresh_after_writes()
+
+    assert replica.values("Sheet1")[1] == ["2025-09-16", "Legs"]
+
+    # the next run finds the replica fresh and pulls nothing
+    next_run = SheetReplica(google, path=str(tmp_path / "replica.sqlite3"))
+    pulls = google.pulls
+    next_run.sync(sheet)
+    assert google.pulls == pulls
+
+
+def test_run_without_writes_reads_the_version_once(tmp_path):
+    google = FakeGoogle([["Date", "Gym"], ["2025-09-16", "Legs"]])
+    sheet = SimpleNamespace(title="Sheet1")
+    SheetReplica(google, path=str(tmp_path / "replica.sqlite3")).sync(sheet)
+
+    replica = SheetReplica(google, path=str(tmp_path / "replica.sqlite3"))
+    reads, pulls = google.version_reads, google.pulls
+    replica.sync(sheet)
+    replica.refresh_after_writes()
+
+    assert (google.version_reads - reads, google.pulls - pulls) == (1, 0)
@@ -0,0 +1,82 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from charts_helpers import column_index, get_contiguous_ranges
+from google_sheets.replica import ReplicaSheet
+from google_sheets.schema import SheetSchema, SheetSchemaError, read_columns
+from google_sheets.sheet_utils import build_sheet_lookup
+
+
+class FakeReplica:
+    """Replica holding the values of one sheet."""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def values(self, title):
+        return self.rows
+
+
+def replica_sheet(rows):
+    return ReplicaSheet(FakeReplica(rows), SimpleNamespace(title="Sheet1", id=1))
+
+
+def test_detect_matches_aliases_case_insensitively():
+    schema = SheetSchema.detect([" weight ", "Ημερομηνία", "Notes", "GYM"])
+    assert schema.columns == {"date": 1, "gym": 3, "weight": 0}
+    assert schema.letter("date") == "B"
+    assert not schema.has("water")
+    with pytest.raises(SheetSchemaError, match="'Νερό' / 'Water'"):
+        schema.index("water")
+
+
+def test_read_columns_pads_short_columns_and_trims_trailing_rows():
+    rows = [
+        ["Date", "Gym", "Treadmill"],
+        ["2025-09-15", "Push", ""],
+        ["2025-09-16", "", "30'"],
+        ["2025-09-17", "", ""],
+        ["", "", ""],
+    ]
+    sheet = replica_sheet(rows)
+    schema = SheetSchema.detect(rows[0])
+    assert read_columns(sheet, schema, "date", "gym", "treadmill") == [
+        ["2025-09-15", "Push", ""],
+        ["2025-09-16", "", "30'"],
+        ["2025-09-17", "", ""],
+    ]
+
+
+def test_lookup_without_optional_columns():
+    rows = [
+        ["Ημερομηνία", "Γυμναστήριο", "Διάδρομος"],
+        ["16/09/25", " Legs ", "Run"],
+        ["September", "", ""],
+    ]
+    lookup = build_sheet_lookup(replica_sheet(rows), SheetSchema.detect(rows[0]))
+    assert lookup == {
+        date(2025, 9, 16): {"gym": "Legs", "treadmill": "Run", "weight": "", "sleep": "", "water": ""}
+    }
+
+
+def test_lookup_requires_the_matching_columns():
+    rows = [["Date", "Gym", "Weight"], ["2025-09-16", "Legs", "80"]]
+    with pytest.raises(SheetSchemaError):
+        build_sheet_lookup(replica_sheet(rows), SheetSchema.detect(rows[0]))
+
+
+def test_column_index_past_z():
+    assert column_index("A") == 0
+    assert column_index(" ab ") == 27
+    assert column_index("BA") == 52
+    assert column_index(27) == 27
+
+
+def test_contiguous_ranges_past_z():
+    values = [[""] * 30 for _ in range(4)]
+    for row, (day, weight) in enumerate([("2025-09-15", "80.1"), ("2025-09-16", "79.9")], start=1):
+        values[row][26], values[row][28] = day, weight
+    x_range, y_range, info = get_contiguous_ranges(None, "AA", "AC", values=values)
+    assert (x_range["startColumnIndex"], y_range["startColumnIndex"]) == (26, 28)
+    assert (info["first_row"], info["last_row"]) == (1, 3)
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pytest
+
+from strava import stream_metrics, streams_cache
+from strava.streams_cache import STREAM_KEYS, get_or_fetch_streams, no_streams_path, save_streams
+
+
+def streams(time, heartrate=None, distance=None, velocity=None):
+    channels = {"time": time, "heartrate": heartrate, "distance": distance, "velocity_smooth": velocity}
+    return {key: {"data": data} for key, data in channels.items() if data is not None}
+
+
+def test_hr_zone_seconds_weights_samples_by_time_to_next():
+    array = save_streams(1, streams([0, 10, 30, 60], heartrate=[100, 140, 180, 180]))
+    # 100/190 -> Z1 for 10 s, 140/190 -> Z3 for 20 s, 180/190 -> Z5 for 30 s, the last sample has no duration
+    assert stream_metrics.hr_zone_seconds(array, hr_max=190) == [10.0, 0.0, 20.0, 0.0, 30.0]
+
+
+def test_hr_zone_seconds_without_heartrate():
+    array = save_streams(1, streams([0, 10, 20]))
+    assert np.isnan(array[STREAM_KEYS.index("heartrate")]).all()
+    assert stream_metrics.hr_zone_seconds(array) is None
+
+
+def test_average_pace_skips_stopped_samples():
+    array = save_streams(1, streams(
+        [0, 300, 400, 700],
+        distance=[0, 1000, 1000, 2000],
+        velocity=[3.3, 3.3, 0.0, 3.3],
+    ))
+    # 600 s moving for 2 km, the 100 s stop isn't counted
+    assert stream_metrics.average_pace(array) == pytest.approx(300.0)
+
+
+def test_average_pace_without_distance():
+    assert stream_metrics.average_pace(save_streams(1, streams([0, 10]))) is None
+
+
+def test_streams_are_fetched_once_and_missing_ones_are_remembered(monkeypatch):
+    responses = {1: streams([0, 1, 2], heartrate=[120, 121, 122]), 2: {}, 3: None}
+    calls = []
+
+    def get_activity_streams(activity_id, keys):
+        calls.append(activity_id)
+        return responses[activity_id]
+
+    monkeypatch.setattr(streams_cache, "get_activity_streams", get_activity_streams)
+    for _ in range(2):
+        assert get_or_fetch_streams(1).shape == (len(STREAM_KEYS), 3)
+        assert get_or_fetch_streams(2) is None
+        assert get_or_fetch_streams(3) is None
+
+    # 1 is cached, 2 has no streams and is marked, 3 failed and is retried
+    assert calls == [1, 2, 3, 3]
+    assert os.path.exists(no_streams_path(2)) and not os.path.exists(no_streams_path(3))